@@ -0,0 +1,253 @@
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+
+from exam_book import (
+    EmployeeService,
+    BookService,
+    SaleService,
+    DataManager,
+    Report
+)
+
+SCALES = {
+    '1e3': (20, 100, 1_000),
+    '1e4': (50, 1_000, 10_000),
+    '1e5': (200, 10_000, 100_000),
+    '1e6': (1_000, 100_000, 1_000_000),
+    '1e7': (5_000, 500_000, 10_000_000)
+}
+
+POSITIONS = ["Manager", "Sales", "Cashier", "Stock"]
+GENRES = ["Novel", "Fantasy", "Poetry", "History", "Science", "Children", "Crime", "Biography"]
+FIRST_SALE_DAY = date(2024, 1, 1)
+SALE_DAYS = 365
+
+
+def generate_data(employees: int, books: int, sales: int, seed: int = 0):
+    rng = random.Random(seed)
+    employee_records = [{"name": f"Employee {i}", "position": rng.choice(POSITIONS), "phone": f"{i:07d}",
+                         "email": f"employee{i}@example.com"} for i in range(employees)]
+    book_records = []
+    for i in range(books):
+        cost = round(rng.uniform(3.0, 40.0), 2)
+        book_records.append({"title": f"Book {i}", "year": rng.randint(1800, 2024),
+                             "author": f"Author {i % max(1, books // 5)}", "genre": rng.choice(GENRES),
+                             "cost": cost, "sale_price": round(cost * 1.4, 2)})
+
+    employee_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(employees)))
+    book_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(books)))
+    dates = [(FIRST_SALE_DAY + timedelta(days=day)).isoformat() for day in range(SALE_DAYS)]
+    sale_employees = array('i', rng.choices(range(employees), cum_weights=employee_weights, k=sales))
+    sale_books = array('i', rng.choices(range(books), cum_weights=book_weights, k=sales))
+    sale_days = array('i', (min(int(rng.triangular(0, SALE_DAYS, SALE_DAYS * 0.8)), SALE_DAYS - 1)
+                            for _ in range(sales)))
+    sale_prices = array('d', (round(book_records[book]["sale_price"] * rng.uniform(0.85, 1.0), 2)
+                              for book in sale_books))
+
+    def sale_records():
+        for employee, book, day, price in zip(sale_employees, sale_books, sale_days, sale_prices):
+            yield {"employee_name": employee_records[employee]["name"], "book_title": book_records[book]["title"],
+                   "sale_date": dates[day], "actual_sale_price": price}
+
+    return employee_records, book_records, sale_records
+
+
+def timed(results: dict, name: str, operations: int, func, *args):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        value = func(*args)
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    results[name] = {
+        "seconds": seconds,
+        "operations": operations,
+        "operations_per_second": operations / seconds if seconds > 0 else None
+    }
+    return value
+
+
+def run_benchmarks(employees: int, books: int, sales: int, seed: int = 0, queries: int = 100):
+    employee_records, book_records, sale_records = generate_data(employees, books, sales, seed)
+    results = {}
+
+    def build_services():
+        employee_service = EmployeeService()
+        book_service = BookService()
+        return employee_service, book_service, SaleService(employee_service, book_service)
+
+    employee_service, book_service, sale_service = build_services()
+
+    def add_each_employee():
+        for record in employee_records:
+            employee_service.add_employee(record["name"], record["position"], record["phone"], record["email"])
+
+    def add_each_book():
+        for record in book_records:
+            book_service.add_book(record["title"], record["year"], record["author"], record["genre"],
+                                  record["cost"], record["sale_price"])
+
+    def add_each_sale():
+        for record in sale_records():
+            sale_service.add_sale(record["employee_name"], record["book_title"], record["sale_date"],
+                                  record["actual_sale_price"])
+
+    timed(results, "add_employee", employees, add_each_employee)
+    timed(results, "add_book", books, add_each_book)
+    timed(results, "add_sale", sales, add_each_sale)
+
+    bulk_employee_service, bulk_book_service, bulk_sale_service = build_services()
+    timed(results, "add_employees", employees, bulk_employee_service.add_employees, employee_records)
+    timed(results, "add_books", books, bulk_book_service.add_books, book_records)
+    timed(results, "add_sales", sales, bulk_sale_service.add_sales, sale_records())
+
+    rng = random.Random(seed + 1)
+    periods = []
+    for _ in range(queries):
+        start = FIRST_SALE_DAY + timedelta(days=rng.randrange(SALE_DAYS - 30))
+        periods.append((start.isoformat(), (start + timedelta(days=30)).isoformat()))
+
+    def query_periods():
+        for start_date, end_date in periods:
+            sale_service.get_sales_by_period(start_date, end_date)
+
+    timed(results, "get_sales_by_period", queries, query_periods)
+
+    def page_periods():
+        for start_date, end_date in periods:
+            sale_service.get_sales_page(start_date, end_date, limit=50)
+
+    timed(results, "get_sales_page", queries, page_periods)
+
+    def search_catalog():
+        for position in range(queries):
+            book_service.search_books(prefix=f"Book {position}")
+            book_service.search_books(text=f"ok {position}", genre=GENRES[position % len(GENRES)])
+            book_service.search_books(min_year=1900 + position, max_price=20.0)
+
+    timed(results, "search_books", queries, search_catalog)
+
+    report = Report(employee_service, book_service, sale_service, cache_entries=0)
+    week_start, _ = periods[0]
+    week_end = (date.fromisoformat(week_start) + timedelta(days=6)).isoformat()
+    timed(results, "generate_sales_report", 1, report.generate_sales_report, week_start, week_end)
+    timed(results, "generate_employee_sales_report", 1, report.generate_employee_sales_report,
+          employee_records[0]["name"])
+    timed(results, "generate_top_books_report", 1, report.generate_top_books_report, 10)
+    timed(results, "generate_revenue_summary", 1, report.generate_revenue_summary)
+    timed(results, "generate_rollup_report", 1, report.generate_rollup_report, "month", "genre")
+    timed(results, "generate_sales_report_page", 1, report.generate_sales_report_page, week_start, week_end)
+    timed(results, "write_sales_report", 1, report.write_sales_report, io.StringIO(), periods[0][0], periods[0][1])
+
+    cached_report = Report(employee_service, book_service, sale_service)
+    cached_report.generate_sales_report(week_start, week_end)
+    timed(results, "generate_sales_report_cached", 1, cached_report.generate_sales_report, week_start, week_end)
+    report.close()
+    cached_report.close()
+
+    records = employees + books + sales
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for extension in (".json", ".jsonl"):
+            paths = [os.path.join(temp_dir, name + extension) for name in ("employees", "books", "sales")]
+            label = extension.lstrip(".")
+            timed(results, f"save_data_{label}", records,
+                  DataManager(employee_service, book_service, sale_service).save_data, *paths)
+            timed(results, f"load_data_{label}", records, DataManager(*build_services()).load_data, *paths)
+        snapshot_path = os.path.join(temp_dir, "bookstore.snap")
+        timed(results, "save_binary", records,
+              DataManager(employee_service, book_service, sale_service).save_binary, snapshot_path)
+        timed(results, "load_binary", records, DataManager(*build_services()).load_binary, snapshot_path)
+
+    return results
+
+
+def best_results(runs: list) -> dict:
+    best = {}
+    for results in runs:
+        for name, result in results.items():
+            if name not in best or result["seconds"] < best[name]["seconds"]:
+                best[name] = result
+    return best
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float = 0.5, noise_floor: float = 0.05):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or current["seconds"] < noise_floor:
+            continue
+        ratio = current["seconds"] / max(previous["seconds"], noise_floor)
+        if ratio > 1 + tolerance:
+            regressions.append({"benchmark": name, "seconds": current["seconds"],
+                                "baseline_seconds": previous["seconds"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bookstore services, persistence and reports.")
+    parser.add_argument("--scale", action="append", choices=sorted(SCALES),
+                        help="dataset scale by number of sales; may be repeated (default: 1e3 and 1e4)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="run each scale this many times and keep the fastest timing (default: 3)")
+    parser.add_argument("--output", help="write results as JSON to this file instead of stdout")
+    parser.add_argument("--baseline", default="benchmark_baseline.json",
+                        help="baseline results to compare against (default: benchmark_baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown against the baseline before failing (default: 0.5)")
+    parser.add_argument("--noise-floor", type=float, default=0.05,
+                        help="ignore benchmarks faster than this many seconds (default: 0.05)")
+    args = parser.parse_args(argv)
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "scales": {}}
+    for scale in args.scale or ["1e3", "1e4"]:
+        employees, books, sales = SCALES[scale]
+        report["scales"][scale] = {
+            "employees": employees,
+            "books": books,
+            "sales": sales,
+            "results": best_results([run_benchmarks(employees, books, sales, args.seed)
+                                     for _ in range(max(args.repeat, 1))])
+        }
+
+    regressions = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        for scale, measured in report["scales"].items():
+            if scale in baseline.get("scales", {}):
+                found = compare_results(measured["results"], baseline["scales"][scale]["results"], args.tolerance,
+                                        args.noise_floor)
+                if found:
+                    regressions[scale] = found
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,375 @@
+import asyncio
+import csv
+import glob
 import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import partial, wraps
+from heapq import nlargest
+from itertools import islice
+from time import perf_counter
+
+
+class OperationStats:
+    __slots__ = ('calls', 'seconds', 'buckets', 'records', 'bytes_read', 'bytes_written')
+
+    def __init__(self, bucket_count: int):
+        self.calls = 0
+        self.seconds = 0.0
+        self.buckets = [0] * bucket_count
+        self.records = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+class Metrics:
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+    COUNTERS = ('records', 'bytes_read', 'bytes_written')
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.operations = {}
+
+    def stats(self, operation: str) -> OperationStats:
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats(len(self.BUCKETS) + 1)
+        return stats
+
+    def observe(self, operation: str, seconds: float):
+        stats = self.stats(operation)
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.buckets[bisect_left(self.BUCKETS, seconds)] += 1
+
+    def count(self, operation: str, counter: str, value: int):
+        if self.enabled:
+            stats = self.stats(operation)
+            setattr(stats, counter, getattr(stats, counter) + value)
+
+    def reset(self):
+        self.operations = {}
+
+    def snapshot(self):
+        snapshot = {}
+        for operation, stats in sorted(self.operations.items()):
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(self.BUCKETS + (float('inf'),), stats.buckets):
+                cumulative += count
+                histogram[bound] = cumulative
+            snapshot[operation] = {
+                'calls': stats.calls,
+                'seconds': stats.seconds,
+                'histogram': histogram,
+                'records': stats.records,
+                'bytes_read': stats.bytes_read,
+                'bytes_written': stats.bytes_written
+            }
+        return snapshot
+
+    def to_prometheus(self, prefix: str = 'bookstore'):
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_operation_calls_total counter"]
+        for operation, stats in snapshot.items():
+            lines.append(f'{prefix}_operation_calls_total{{operation="{operation}"}} {stats["calls"]}')
+        lines.append(f"# TYPE {prefix}_operation_seconds histogram")
+        for operation, stats in snapshot.items():
+            for bound, count in stats['histogram'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_operation_seconds_bucket{{operation="{operation}",le="{le}"}} {count}')
+            lines.append(f'{prefix}_operation_seconds_sum{{operation="{operation}"}} {stats["seconds"]}')
+            lines.append(f'{prefix}_operation_seconds_count{{operation="{operation}"}} {stats["calls"]}')
+        for counter in self.COUNTERS:
+            lines.append(f"# TYPE {prefix}_{counter}_total counter")
+            for operation, stats in snapshot.items():
+                if stats[counter]:
+                    lines.append(f'{prefix}_{counter}_total{{operation="{operation}"}} {stats[counter]}')
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path: str):
+        text = self.to_prometheus()
+        write_file_atomically(path, lambda f: f.write(text))
+
+
+metrics = Metrics(enabled=os.environ.get('BOOKSTORE_METRICS', '1') != '0')
+
+
+def instrumented(func):
+    operation = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.observe(operation, perf_counter() - start)
+
+    return wrapper
+
+
+def date_to_ordinal(value: str) -> int:
+    return date.fromisoformat(value).toordinal()
+
+
+def iter_json_records(f, chunk_size: int = 65536):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    while position == len(buffer):
+        buffer = f.read(chunk_size)
+        if not buffer:
+            return
+        position = 0
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+    if buffer[position] != '[':
+        pending = buffer[position:]
+        while True:
+            lines = pending.split('\n')
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+        if pending.strip():
+            yield json.loads(pending)
+        return
+
+    position += 1
+    eof = False
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ','):
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            record, end = None, None
+        if end is not None and (end < len(buffer) or eof):
+            yield record
+            position = end
+            continue
+        if eof:
+            raise ValueError("Unterminated JSON array.")
+        buffer = buffer[position:]
+        position = 0
+        chunk = f.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+
+def iter_batches(records, batch_size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_json_records(f, records, json_lines: bool = False):
+    if json_lines:
+        for record in records:
+            f.write(json.dumps(record))
+            f.write('\n')
+    else:
+        f.write('[')
+        for position, record in enumerate(records):
+            if position:
+                f.write(', ')
+            f.write(json.dumps(record))
+        f.write(']')
+
+
+def write_temp_file(path: str, write, mode: str = 'w') -> str:
+    temp_path = path + '.tmp'
+    with open(temp_path, mode) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    return temp_path
+
+
+def write_file_atomically(path: str, write, mode: str = 'w'):
+    os.replace(write_temp_file(path, write, mode), path)
+
+
+def as_array(typecode: str, values) -> array:
+    if isinstance(values, array):
+        return values
+    copy = array(typecode)
+    copy.frombytes(values.cast('B'))
+    return copy
+
+
+class Journal:
+    def __init__(self, path: str):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+        self.seq = 0
+        self.checkpoint_seq = 0
+        self.records_since_checkpoint = 0
+        self.file = None
+
+    def write_checkpoint(self, seq: int, pending=()):
+        checkpoint = {'seq': seq, 'pending': [list(item) for item in pending]}
+        write_file_atomically(self.checkpoint_path, lambda f: json.dump(checkpoint, f))
+        self.checkpoint_seq = seq
+
+    def recover(self):
+        checkpoint = {'seq': 0, 'pending': []}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        self.checkpoint_seq = checkpoint['seq']
+        if checkpoint['pending']:
+            for temp_path, path in checkpoint['pending']:
+                if os.path.exists(temp_path):
+                    os.replace(temp_path, path)
+            self.write_checkpoint(checkpoint['seq'])
+        self.seq = max(self.seq, self.checkpoint_seq)
+
+    def replay(self):
+        self.records_since_checkpoint = 0
+        if not os.path.exists(self.path):
+            return
+        good_offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("Torn journal record.")
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_offset += len(line)
+                if record['seq'] > self.checkpoint_seq:
+                    self.seq = record['seq']
+                    self.records_since_checkpoint += 1
+                    yield record
+        if good_offset < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_offset)
+
+    @instrumented
+    def append(self, op: str, args: dict):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.seq += 1
+        line = json.dumps({'seq': self.seq, 'op': op, 'args': args}) + '\n'
+        self.file.write(line)
+        self.records_since_checkpoint += 1
+        metrics.count('Journal.append', 'bytes_written', len(line))
+
+    def sync(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def reset(self):
+        self.close()
+        with open(self.path, 'w') as f:
+            os.fsync(f.fileno())
+        self.records_since_checkpoint = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def expand_paths(paths) -> list:
+    if isinstance(paths, str):
+        paths = [paths]
+    expanded = []
+    for path in paths:
+        if any(char in path for char in '*?['):
+            expanded.extend(sorted(glob.glob(path)))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+class SalesShard:
+    __slots__ = ('employee_names', 'book_titles', 'dates', 'ordinals',
+                 'employee_idx', 'book_idx', 'date_idx', 'prices')
+
+    def __init__(self):
+        self.employee_names = []
+        self.book_titles = []
+        self.dates = []
+        self.ordinals = array('i')
+        self.employee_idx = array('i')
+        self.book_idx = array('i')
+        self.date_idx = array('i')
+        self.prices = []
+
+    def __len__(self):
+        return len(self.prices)
+
+    def records(self):
+        for employee, book, day, price in zip(self.employee_idx, self.book_idx, self.date_idx, self.prices):
+            yield {
+                'employee_name': self.employee_names[employee],
+                'book_title': self.book_titles[book],
+                'sale_date': self.dates[day],
+                'actual_sale_price': price
+            }
+
+
+def parse_sales_shard(path: str) -> SalesShard:
+    shard = SalesShard()
+    employees = {}
+    books = {}
+    days = {}
+    with open(path, 'r') as f:
+        for record in iter_json_records(f):
+            employee = employees.get(record['employee_name'])
+            if employee is None:
+                employee = employees[record['employee_name']] = len(shard.employee_names)
+                shard.employee_names.append(record['employee_name'])
+            book = books.get(record['book_title'])
+            if book is None:
+                book = books[record['book_title']] = len(shard.book_titles)
+                shard.book_titles.append(record['book_title'])
+            day = days.get(record['sale_date'])
+            if day is None:
+                day = days[record['sale_date']] = len(shard.dates)
+                shard.dates.append(record['sale_date'])
+                shard.ordinals.append(date_to_ordinal(record['sale_date']))
+            shard.employee_idx.append(employee)
+            shard.book_idx.append(book)
+            shard.date_idx.append(day)
+            shard.prices.append(record['actual_sale_price'])
+    return shard
+
 
 class Employee:
+    __slots__ = ('name', 'position', 'phone', 'email')
+
     def __init__(self, name: str, position: str, phone: str, email: str):
         self.name = name
         self.position = position
@@ -10,6 +379,14 @@ class Employee:
     def __str__(self):
         return f"Employee(Name: {self.name}, Position: {self.position}, Phone: {self.phone}, Email: {self.email})"
 
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'position': self.position,
+            'phone': self.phone,
+            'email': self.email
+        }
+
 
 class EmployeeFactory:
     @staticmethod
@@ -18,6 +395,8 @@ class EmployeeFactory:
 
 
 class Book:
+    __slots__ = ('title', 'year', 'author', 'genre', 'cost', 'sale_price')
+
     def __init__(self, title: str, year: int, author: str, genre: str, cost: float, sale_price: float):
         self.title = title
         self.year = year
@@ -30,6 +409,16 @@ class Book:
         return (f"Book(Title: {self.title}, Year: {self.year}, Author: {self.author}, "
                 f"Genre: {self.genre}, Cost: {self.cost}, Sale Price: {self.sale_price})")
 
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'year': self.year,
+            'author': self.author,
+            'genre': self.genre,
+            'cost': self.cost,
+            'sale_price': self.sale_price
+        }
+
 
 class BookFactory:
     @staticmethod
@@ -38,6 +427,8 @@ class BookFactory:
 
 
 class Sale:
+    __slots__ = ('employee', 'book', 'sale_date', 'actual_sale_price')
+
     def __init__(self, employee: Employee, book: Book, sale_date: str, actual_sale_price: float):
         self.employee = employee
         self.book = book
@@ -48,6 +439,14 @@ class Sale:
         return (f"Sale(Employee: {self.employee.name}, Book: {self.book.title}, "
                 f"Date: {self.sale_date}, Actual Sale Price: {self.actual_sale_price})")
 
+    def to_dict(self):
+        return {
+            'employee_name': self.employee.name,
+            'book_title': self.book.title,
+            'sale_date': self.sale_date,
+            'actual_sale_price': self.actual_sale_price
+        }
+
 
 class SaleFactory:
     @staticmethod
@@ -55,291 +454,2274 @@ class SaleFactory:
         return Sale(employee, book, sale_date, actual_sale_price)
 
 
-class EmployeeService:
+class SnapshotView:
+    __slots__ = ('items', 'start', 'stop')
+
+    def __init__(self, items, start: int = 0, stop: int = None):
+        self.items = items
+        self.start = start
+        self.stop = len(items) if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self.items[self.start + position] for position in range(start, stop, step)]
+            return SnapshotView(self.items, self.start + start, self.start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Snapshot index out of range.")
+        return self.items[self.start + index]
+
+    def __iter__(self):
+        items = self.items
+        for position in range(self.start, self.stop):
+            yield items[position]
+
+
+class SaleStore:
     def __init__(self):
+        self.employee_ids = array('i')
+        self.book_ids = array('i')
+        self.ordinals = array('i')
+        self.prices = array('d')
         self.employees = []
+        self.books = []
+        self.employee_keys = {}
+        self.book_keys = {}
+        self.mapped = False
+
+    @classmethod
+    def from_columns(cls, employees: list, books: list, employee_ids, book_ids, ordinals, prices):
+        store = cls()
+        store.employees = employees
+        store.books = books
+        store.employee_keys = {employee: employee_id for employee_id, employee in enumerate(employees)}
+        store.book_keys = {book: book_id for book_id, book in enumerate(books)}
+        store.employee_ids = employee_ids
+        store.book_ids = book_ids
+        store.ordinals = ordinals
+        store.prices = prices
+        store.mapped = not isinstance(prices, array)
+        return store
+
+    def detach(self):
+        self.employee_ids = as_array('i', self.employee_ids)
+        self.book_ids = as_array('i', self.book_ids)
+        self.ordinals = as_array('i', self.ordinals)
+        self.prices = as_array('d', self.prices)
+        self.mapped = False
+
+    def add(self, employee: Employee, book: Book, ordinal: int, actual_sale_price: float) -> int:
+        if self.mapped:
+            self.detach()
+        employee_id = self.employee_keys.get(employee)
+        if employee_id is None:
+            employee_id = self.employee_keys[employee] = len(self.employees)
+            self.employees.append(employee)
+        book_id = self.book_keys.get(book)
+        if book_id is None:
+            book_id = self.book_keys[book] = len(self.books)
+            self.books.append(book)
+        self.employee_ids.append(employee_id)
+        self.book_ids.append(book_id)
+        self.ordinals.append(ordinal)
+        self.prices.append(actual_sale_price)
+        return len(self.prices) - 1
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [SaleView(self, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("Sale index out of range.")
+        return SaleView(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield SaleView(self, row)
+
+
+class SaleView:
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store: SaleStore, row: int):
+        self.store = store
+        self.row = row
+
+    @property
+    def employee(self) -> Employee:
+        return self.store.employees[self.store.employee_ids[self.row]]
+
+    @property
+    def book(self) -> Book:
+        return self.store.books[self.store.book_ids[self.row]]
+
+    @property
+    def sale_date(self) -> str:
+        return date.fromordinal(self.store.ordinals[self.row]).isoformat()
+
+    @property
+    def actual_sale_price(self) -> float:
+        return self.store.prices[self.row]
+
+    def __eq__(self, other):
+        return isinstance(other, SaleView) and self.store is other.store and self.row == other.row
+
+    def __hash__(self):
+        return hash((id(self.store), self.row))
+
+    __str__ = Sale.__str__
+    to_dict = Sale.to_dict
+
+
+class SalesTotals:
+    def __init__(self):
+        self.count = 0
+        self.revenue = 0.0
+        self.by_book = {}
+        self.by_employee = {}
+        self.by_day = {}
+        self.employee_rows = {}
+
+    def add(self, employee: Employee, book: Book, ordinal: int, actual_sale_price: float, row: int):
+        self.count += 1
+        self.revenue += actual_sale_price
+        for totals, key in ((self.by_book, book), (self.by_employee, employee), (self.by_day, ordinal)):
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [1, actual_sale_price]
+            else:
+                entry[0] += 1
+                entry[1] += actual_sale_price
+        rows = self.employee_rows.get(employee)
+        if rows is None:
+            rows = self.employee_rows[employee] = array('i')
+        elif not isinstance(rows, array):
+            rows = self.employee_rows[employee] = as_array('i', rows)
+        rows.append(row)
+
+    def margin(self):
+        return self.revenue - sum(count * book.cost for book, (count, _) in self.by_book.items())
+
+    def by_title(self):
+        titles = {}
+        for book, (count, revenue) in self.by_book.items():
+            entry = titles.get(book.title)
+            if entry is None:
+                titles[book.title] = [count, revenue]
+            else:
+                entry[0] += count
+                entry[1] += revenue
+        return titles
 
+    def rows_for_employee(self, name: str):
+        matches = [rows for employee, rows in self.employee_rows.items() if employee.name == name]
+        if len(matches) == 1:
+            return matches[0]
+        return sorted(row for rows in matches for row in rows)
+
+
+class SalesRollups:
+    DIMENSIONS = ('total', 'employee', 'book', 'genre')
+    PERIODS = ('day', 'week', 'month', 'year')
+
+    def __init__(self):
+        self.count = 0
+        self.days = {}
+        self.day_ordinals = array('i')
+        self.summaries = {}
+
+    def add(self, employee: Employee, book: Book, ordinal: int, actual_sale_price: float):
+        cells = self.days.get(ordinal)
+        if cells is None:
+            cells = self.days[ordinal] = {}
+            self.summaries[ordinal] = {'total': [0, 0.0, 0.0], 'employee': {}, 'book': {}, 'genre': {}}
+            insort(self.day_ordinals, ordinal)
+        self.count += 1
+        entry = cells.get((employee, book))
+        if entry is None:
+            cells[(employee, book)] = [1, actual_sale_price]
+        else:
+            entry[0] += 1
+            entry[1] += actual_sale_price
+        summary = self.summaries.get(ordinal)
+        if summary is None:
+            return
+        margin = actual_sale_price - book.cost
+        total = summary['total']
+        total[0] += 1
+        total[1] += actual_sale_price
+        total[2] += margin
+        for dimension, key in (('employee', employee.name), ('book', book.title), ('genre', book.genre)):
+            entry = summary[dimension].get(key)
+            if entry is None:
+                summary[dimension][key] = [1, actual_sale_price, margin]
+            else:
+                entry[0] += 1
+                entry[1] += actual_sale_price
+                entry[2] += margin
+
+    @staticmethod
+    def add_to_summary(summary: dict, employee: Employee, book: Book, units: int, revenue: float):
+        margin = revenue - units * book.cost
+        total = summary['total']
+        total[0] += units
+        total[1] += revenue
+        total[2] += margin
+        for dimension, key in (('employee', employee.name), ('book', book.title), ('genre', book.genre)):
+            entry = summary[dimension].get(key)
+            if entry is None:
+                summary[dimension][key] = [units, revenue, margin]
+            else:
+                entry[0] += units
+                entry[1] += revenue
+                entry[2] += margin
+
+    def summary(self, ordinal: int) -> dict:
+        summary = self.summaries.get(ordinal)
+        if summary is None:
+            summary = {'total': [0, 0.0, 0.0], 'employee': {}, 'book': {}, 'genre': {}}
+            for (employee, book), (units, revenue) in self.days[ordinal].items():
+                self.add_to_summary(summary, employee, book, units, revenue)
+            self.summaries[ordinal] = summary
+        return summary
+
+    @staticmethod
+    def period_label(ordinal: int, period: str) -> str:
+        day = date.fromordinal(ordinal)
+        if period == 'day':
+            return day.isoformat()
+        if period == 'week':
+            year, week, _ = day.isocalendar()
+            return f"{year}-W{week:02d}"
+        if period == 'month':
+            return f"{day.year}-{day.month:02d}"
+        if period == 'year':
+            return str(day.year)
+        raise ValueError(f"Unknown rollup period '{period}'.")
+
+    @classmethod
+    def combine(cls, day_rows, period: str = 'day', dimension: str = 'total'):
+        if period not in cls.PERIODS:
+            raise ValueError(f"Unknown rollup period '{period}'.")
+        if dimension not in cls.DIMENSIONS:
+            raise ValueError(f"Unknown rollup dimension '{dimension}'.")
+        rollup = {}
+        labels = {}
+        for ordinal, key, units, revenue, margin in day_rows:
+            label = labels.get(ordinal)
+            if label is None:
+                label = labels[ordinal] = cls.period_label(ordinal, period)
+            buckets = rollup.get(label)
+            if buckets is None:
+                buckets = rollup[label] = {}
+            entry = buckets.get(key)
+            if entry is None:
+                buckets[key] = [units, revenue, margin]
+            else:
+                entry[0] += units
+                entry[1] += revenue
+                entry[2] += margin
+        if dimension == 'total':
+            return {label: buckets[None] for label, buckets in rollup.items()}
+        return rollup
+
+    def day_rows(self, dimension: str, start: int = None, end: int = None):
+        first = 0 if start is None else bisect_left(self.day_ordinals, start)
+        last = len(self.day_ordinals) if end is None else bisect_right(self.day_ordinals, end)
+        for position in range(first, last):
+            ordinal = self.day_ordinals[position]
+            summary = self.summary(ordinal)
+            if dimension == 'total':
+                yield (ordinal, None, *summary['total'])
+            else:
+                for key, (units, revenue, margin) in summary[dimension].items():
+                    yield ordinal, key, units, revenue, margin
+
+    def query(self, period: str = 'day', dimension: str = 'total', start_date: str = None, end_date: str = None):
+        start = date_to_ordinal(start_date) if start_date else None
+        end = date_to_ordinal(end_date) if end_date else None
+        return self.combine(self.day_rows(dimension, start, end), period, dimension)
+
+    def to_dict(self):
+        return {
+            'sales': self.count,
+            'days': {date.fromordinal(ordinal).isoformat(): [[employee.name, book.title, units, revenue]
+                                                             for (employee, book), (units, revenue)
+                                                             in self.days[ordinal].items()]
+                     for ordinal in self.day_ordinals}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, employees: dict, books: dict):
+        rollups = cls()
+        rollups.count = data['sales']
+        for sale_date, cells in data['days'].items():
+            rollups.days[date_to_ordinal(sale_date)] = {(employees[name], books[title]): [units, revenue]
+                                                        for name, title, units, revenue in cells}
+        rollups.day_ordinals = array('i', sorted(rollups.days))
+        return rollups
+
+
+class KeyRange:
+    __slots__ = ('entries', 'start', 'end')
+
+    def __init__(self, entries: list, start: int, end: int):
+        self.entries = entries
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return max(self.end - self.start, 0)
+
+    def __iter__(self):
+        entries = self.entries
+        for position in range(self.start, self.end):
+            yield entries[position][1]
+
+
+class BookCatalog:
+    def __init__(self):
+        self.next_id = 0
+        self.ids = {}
+        self.books = {}
+        self.snapshot = None
+        self.titles = []
+        self.trigrams = None
+        self.authors = {}
+        self.genres = {}
+        self.years = []
+        self.prices = []
+        self.index_sorted = True
+        self.index_lock = threading.Lock()
+
+    @staticmethod
+    def trigrams_of(key: str):
+        return {key[i:i + 3] for i in range(len(key) - 2)}
+
+    def add(self, book: Book):
+        self.add_many([book])
+
+    def add_many(self, books: list):
+        bulk = len(books) >= 64
+        if bulk:
+            self.index_sorted = False
+        sort = self.index_sorted
+        titles = []
+        trigrams = self.trigrams
+        for book in books:
+            book_id = self.next_id
+            self.next_id += 1
+            self.ids[book] = book_id
+            self.books[book_id] = book
+            if self.snapshot is not None:
+                self.snapshot.append(book)
+            key = book.title.casefold()
+            titles.append((key, book_id))
+            if trigrams is not None:
+                for trigram in self.trigrams_of(key):
+                    trigrams[trigram].add(book_id)
+            self.index_attributes(book, sort)
+        self.insert_sorted(self.titles, titles, sort)
+
+    @staticmethod
+    def insert_sorted(entries: list, new_entries: list, sort: bool = True):
+        for entry in new_entries:
+            if not sort or not entries or entries[-1] < entry:
+                entries.append(entry)
+            else:
+                insort(entries, entry)
+
+    def sort_index(self):
+        if not self.index_sorted:
+            with self.index_lock:
+                if not self.index_sorted:
+                    for entries in (self.titles, self.years, self.prices):
+                        entries.sort()
+                    self.index_sorted = True
+
+    def remove(self, book: Book):
+        self.unindex_attributes(book)
+        book_id = self.ids.pop(book)
+        del self.books[book_id]
+        self.snapshot = None
+        key = book.title.casefold()
+        del self.titles[bisect_left(self.titles, (key, book_id))]
+        if self.trigrams is not None:
+            for trigram in self.trigrams_of(key):
+                ids = self.trigrams[trigram]
+                ids.discard(book_id)
+                if not ids:
+                    del self.trigrams[trigram]
+
+    def build_trigrams(self):
+        trigrams = defaultdict(set)
+        for key, book_id in self.titles:
+            for trigram in self.trigrams_of(key):
+                trigrams[trigram].add(book_id)
+        self.trigrams = trigrams
+
+    def index_attributes(self, book: Book, sort: bool = True):
+        book_id = self.ids[book]
+        for index, key in ((self.authors, book.author.casefold()), (self.genres, book.genre.casefold())):
+            ids = index.get(key)
+            if ids is None:
+                ids = index[key] = set()
+            ids.add(book_id)
+        self.insert_sorted(self.years, [(book.year, book_id)], sort)
+        self.insert_sorted(self.prices, [(book.sale_price, book_id)], sort)
+
+    def unindex_attributes(self, book: Book):
+        self.sort_index()
+        book_id = self.ids[book]
+        for index, key in ((self.authors, book.author.casefold()), (self.genres, book.genre.casefold())):
+            ids = index[key]
+            ids.discard(book_id)
+            if not ids:
+                del index[key]
+        for entries, key in ((self.years, book.year), (self.prices, book.sale_price)):
+            del entries[bisect_left(entries, (key, book_id))]
+
+    def search(self, prefix: str = None, text: str = None, author: str = None, genre: str = None,
+               min_year: int = None, max_year: int = None, min_price: float = None, max_price: float = None,
+               offset: int = 0, limit: int = 20):
+        prefix = prefix.casefold() if prefix else None
+        text = text.casefold() if text else None
+        author = author.casefold() if author else None
+        genre = genre.casefold() if genre else None
+
+        self.sort_index()
+        first, last = 0, len(self.titles)
+        if prefix:
+            first = bisect_left(self.titles, (prefix,))
+            last = bisect_left(self.titles, (prefix + '\U0010ffff',))
+        candidates = []
+        if text and len(text) >= 3:
+            if self.trigrams is None:
+                self.build_trigrams()
+            candidates.append(min((self.trigrams.get(trigram, ()) for trigram in self.trigrams_of(text)), key=len))
+        if author:
+            candidates.append(self.authors.get(author, set()))
+        if genre:
+            candidates.append(self.genres.get(genre, set()))
+        for entries, low, high in ((self.years, min_year, max_year), (self.prices, min_price, max_price)):
+            if low is not None or high is not None:
+                start = 0 if low is None else bisect_left(entries, (low,))
+                end = len(entries) if high is None else bisect_right(entries, (high, float('inf')))
+                candidates.append(KeyRange(entries, start, end))
+
+        def matches(book_id: int):
+            book = self.books[book_id]
+            if prefix or text:
+                key = book.title.casefold()
+                if (prefix and not key.startswith(prefix)) or (text and text not in key):
+                    return False
+            return ((author is None or book.author.casefold() == author)
+                    and (genre is None or book.genre.casefold() == genre)
+                    and (min_year is None or book.year >= min_year)
+                    and (max_year is None or book.year <= max_year)
+                    and (min_price is None or book.sale_price >= min_price)
+                    and (max_price is None or book.sale_price <= max_price))
+
+        wanted = offset + limit
+        smallest = min(candidates, key=len) if candidates else None
+        selectivity = 1.0
+        for candidate in candidates:
+            selectivity *= len(candidate) / max(len(self.titles), 1)
+        if smallest is None or last - first < len(smallest) or wanted < len(smallest) * selectivity:
+            found = []
+            for position in range(first, last):
+                book_id = self.titles[position][1]
+                if matches(book_id):
+                    found.append(book_id)
+                    if len(found) >= wanted:
+                        break
+        else:
+            found = sorted((book_id for book_id in smallest if matches(book_id)),
+                           key=lambda book_id: (self.books[book_id].title.casefold(), book_id))
+        return [self.books[book_id] for book_id in found[offset:wanted]]
+
+
+class ChangeNotifier:
+    def notify(self, op: str, **args):
+        for listener in self.listeners:
+            listener(op, args)
+
+
+class EmployeeService(ChangeNotifier):
+    def __init__(self):
+        self.employees = []
+        self.employees_shared = False
+        self.listeners = []
+        self.employees_by_name = {}
+        self.employees_by_email = {}
+
+    @instrumented
     def add_employee(self, name: str, position: str, phone: str, email: str):
-        for emp in self.employees:
-            if emp.name == name or emp.email == email:
-                raise ValueError("Employee with this name or email already exists.")
+        if name in self.employees_by_name or email in self.employees_by_email:
+            raise ValueError("Employee with this name or email already exists.")
         employee = EmployeeFactory.create_employee(name, position, phone, email)
         self.employees.append(employee)
+        self.employees_by_name[name] = employee
+        self.employees_by_email[email] = employee
+        self.notify('add_employee', name=name, position=position, phone=phone, email=email)
+
+    @instrumented
+    def add_employees(self, records):
+        employees = []
+        names = set()
+        emails = set()
+        for record in records:
+            name, email = record['name'], record['email']
+            if (name in self.employees_by_name or email in self.employees_by_email
+                    or name in names or email in emails):
+                raise ValueError("Employee with this name or email already exists.")
+            names.add(name)
+            emails.add(email)
+            employees.append(EmployeeFactory.create_employee(name, record['position'], record['phone'], email))
 
+        self.employees.extend(employees)
+        metrics.count('EmployeeService.add_employees', 'records', len(employees))
+        self.employees_by_name.update((employee.name, employee) for employee in employees)
+        self.employees_by_email.update((employee.email, employee) for employee in employees)
+        if self.listeners:
+            self.notify('add_employees', records=[employee.to_dict() for employee in employees])
+
+    def find_employee(self, name: str):
+        return self.employees_by_name.get(name)
+
+    @instrumented
     def remove_employee(self, name: str):
-        updated_employees = []
-        removed = False
-        found = False
-        for emp in self.employees:
-            if emp.name == name and not removed:
-                removed = True
-                found = True
-            else:
-                updated_employees.append(emp)
-        if not found:
+        employee = self.employees_by_name.pop(name, None)
+        if employee is None:
             print(f"Employee with name '{name}' not found.")
-
-        self.employees = updated_employees
+            return
+        del self.employees_by_email[employee.email]
+        if self.employees_shared:
+            self.employees = self.employees.copy()
+            self.employees_shared = False
+        self.employees.remove(employee)
+        self.notify('remove_employee', name=name)
 
     def get_all_employees(self):
-        return self.employees
+        self.employees_shared = True
+        return SnapshotView(self.employees)
 
+    def iter_employees(self, position: str = None, offset: int = 0, limit: int = None):
+        employees = self.get_all_employees()
+        stop = None if limit is None else offset + limit
+        if position is None:
+            return iter(employees[offset:stop])
+        return islice((employee for employee in employees if employee.position == position), offset, stop)
+
+    @instrumented
     def edit_employee(self, name: str, new_position: str = None, new_phone: str = None, new_email: str = None):
-        for emp in self.employees:
-            if emp.name == name:
-                if new_position:
-                    emp.position = new_position
-                if new_phone:
-                    emp.phone = new_phone
-                if new_email:
-                    emp.email = new_email
-                return emp
-        raise ValueError("Employee not found")
-
-
-class BookService:
+        emp = self.employees_by_name.get(name)
+        if emp is None:
+            raise ValueError("Employee not found")
+        if new_email and new_email != emp.email:
+            if new_email in self.employees_by_email:
+                raise ValueError("Employee with this email already exists.")
+            del self.employees_by_email[emp.email]
+            self.employees_by_email[new_email] = emp
+            emp.email = new_email
+        if new_position:
+            emp.position = new_position
+        if new_phone:
+            emp.phone = new_phone
+        self.notify('edit_employee', name=name, new_position=new_position, new_phone=new_phone, new_email=new_email)
+        return emp
+
+
+class BookService(ChangeNotifier):
     def __init__(self):
-        self.books = []
+        self.catalog = BookCatalog()
+        self.listeners = []
+        self.books_by_title = {}
+        self.books_by_title_author = {}
+
+    @property
+    def books(self):
+        return self.get_all_books()
 
+    @instrumented
     def add_book(self, title: str, year: int, author: str, genre: str, cost: float, sale_price: float):
-        for book in self.books:
-            if book.title == title and book.author == author:
-                raise ValueError("Book with this title and author already exists.")
+        if (title, author) in self.books_by_title_author:
+            raise ValueError("Book with this title and author already exists.")
 
         book = BookFactory.create_book(title, year, author, genre, cost, sale_price)
-        self.books.append(book)
+        self.catalog.add(book)
+        self.books_by_title.setdefault(title, []).append(book)
+        self.books_by_title_author[(title, author)] = book
+        self.notify('add_book', title=title, year=year, author=author, genre=genre, cost=cost, sale_price=sale_price)
+
+    @instrumented
+    def add_books(self, records):
+        books = []
+        keys = set()
+        for record in records:
+            key = (record['title'], record['author'])
+            if key in self.books_by_title_author or key in keys:
+                raise ValueError("Book with this title and author already exists.")
+            keys.add(key)
+            books.append(BookFactory.create_book(record['title'], record['year'], record['author'], record['genre'],
+                                                 record['cost'], record['sale_price']))
 
+        self.catalog.add_many(books)
+        metrics.count('BookService.add_books', 'records', len(books))
+        for book in books:
+            self.books_by_title.setdefault(book.title, []).append(book)
+        self.books_by_title_author.update(((book.title, book.author), book) for book in books)
+        if self.listeners:
+            self.notify('add_books', records=[book.to_dict() for book in books])
+
+    def find_book(self, title: str, author: str = None):
+        if author is not None:
+            return self.books_by_title_author.get((title, author))
+        same_title = self.books_by_title.get(title)
+        return same_title[0] if same_title else None
+
+    @instrumented
     def remove_book(self, title: str):
-        found = False
-        updated_books = []
-
-        for book in self.books:
-            if book.title == title and not found:
-                found = True
-            else:
-                updated_books.append(book)
-
-        if not found:
+        book = self.find_book(title)
+        if book is None:
             print(f"Book with title '{title}' not found.")
+            return
 
-        self.books = updated_books
+        same_title = self.books_by_title[title]
+        same_title.pop(0)
+        if not same_title:
+            del self.books_by_title[title]
+        del self.books_by_title_author[(title, book.author)]
+        self.catalog.remove(book)
+        self.notify('remove_book', title=title)
 
+    @instrumented
     def edit_book(self, title: str, new_year: int = None, new_author: str = None, new_genre: str = None,
                   new_cost: float = None, new_sale_price: float = None):
-        for book in self.books:
-            if book.title == title:
-                if new_year:
-                    book.year = new_year
-                if new_author:
-                    book.author = new_author
-                if new_genre:
-                    book.genre = new_genre
-                if new_cost:
-                    book.cost = new_cost
-                if new_sale_price:
-                    book.sale_price = new_sale_price
-                return book
-        raise ValueError("Book not found")
+        book = self.find_book(title)
+        if book is None:
+            raise ValueError("Book not found")
+        if new_author and new_author != book.author and (title, new_author) in self.books_by_title_author:
+            raise ValueError("Book with this title and author already exists.")
+        self.catalog.unindex_attributes(book)
+        if new_author and new_author != book.author:
+            del self.books_by_title_author[(title, book.author)]
+            self.books_by_title_author[(title, new_author)] = book
+            book.author = new_author
+        if new_year:
+            book.year = new_year
+        if new_genre:
+            book.genre = new_genre
+        if new_cost:
+            book.cost = new_cost
+        if new_sale_price:
+            book.sale_price = new_sale_price
+        self.catalog.index_attributes(book)
+        self.notify('edit_book', title=title, new_year=new_year, new_author=new_author, new_genre=new_genre,
+                    new_cost=new_cost, new_sale_price=new_sale_price)
+        return book
+
+    @instrumented
+    def search_books(self, prefix: str = None, text: str = None, author: str = None, genre: str = None,
+                     min_year: int = None, max_year: int = None, min_price: float = None, max_price: float = None,
+                     offset: int = 0, limit: int = 20):
+        return self.catalog.search(prefix, text, author, genre, min_year, max_year, min_price, max_price,
+                                   offset, limit)
 
     def get_all_books(self):
-        return self.books
-
-
-class SaleService:
-    def __init__(self, employee_service: EmployeeService, book_service: BookService):
-        self.sales = []
+        if self.catalog.snapshot is None:
+            self.catalog.snapshot = list(self.catalog.books.values())
+        return SnapshotView(self.catalog.snapshot)
+
+    def iter_books(self, genre: str = None, author: str = None, offset: int = 0, limit: int = None):
+        books = self.get_all_books()
+        stop = None if limit is None else offset + limit
+        if genre is None and author is None:
+            return iter(books[offset:stop])
+        return islice((book for book in books
+                       if (genre is None or book.genre == genre) and (author is None or book.author == author)),
+                      offset, stop)
+
+
+class SaleService(ChangeNotifier):
+    def __init__(self, employee_service: EmployeeService, book_service: BookService, columnar: bool = False):
+        self.columnar = columnar
+        self.sales = SaleStore() if columnar else []
+        self.listeners = []
+        self.sale_ordinals = array('i')
+        self.sale_rows = array('i')
+        self.index_sorted = True
+        self.index_tail = []
+        self.index_lock = threading.Lock()
+        self.totals = SalesTotals()
+        self.rollups = SalesRollups()
         self.employee_service = employee_service
         self.book_service = book_service
+        book_service.listeners.append(self.book_changed)
 
-    def add_sale(self, employee_name: str, book_title: str, sale_date: str, actual_sale_price: float):
-        employees = self.employee_service.get_all_employees()
-        books = self.book_service.get_all_books()
+    def book_changed(self, op: str, args: dict):
+        if op == 'edit_book' and (args['new_cost'] or args['new_genre']) and self.rollups is not None:
+            self.rollups.summaries.clear()
 
-        employee = None
-        for e in employees:
-            if e.name == employee_name:
-                employee = e
-                break
+    @instrumented
+    def add_sale(self, employee_name: str, book_title: str, sale_date: str, actual_sale_price: float):
+        employee = self.employee_service.find_employee(employee_name)
         if employee is None:
             raise ValueError(f"Employee '{employee_name}' not found.")
 
-        book = None
-        for b in books:
-            if b.title == book_title:
-                book = b
-                break
+        book = self.book_service.find_book(book_title)
         if book is None:
             raise ValueError(f"Book '{book_title}' not found.")
 
-        sale = Sale(employee, book, sale_date, actual_sale_price)
-        self.sales.append(sale)
+        ordinal = date_to_ordinal(sale_date)
+        if self.columnar:
+            row = self.sales.add(employee, book, ordinal, actual_sale_price)
+        else:
+            row = len(self.sales)
+            self.sales.append(SaleFactory.create_sale(employee, book, sale_date, actual_sale_price))
+        self.index_sale(row, ordinal)
+        self.totals.add(employee, book, ordinal, actual_sale_price, row)
+        if self.rollups is not None:
+            self.rollups.add(employee, book, ordinal, actual_sale_price)
+        self.notify('add_sale', employee_name=employee_name, book_title=book_title, sale_date=sale_date,
+                    actual_sale_price=actual_sale_price)
+
+    @instrumented
+    def add_sales(self, records):
+        resolved = []
+        for record in records:
+            employee = self.employee_service.find_employee(record['employee_name'])
+            if employee is None:
+                raise ValueError(f"Employee '{record['employee_name']}' not found.")
+            book = self.book_service.find_book(record['book_title'])
+            if book is None:
+                raise ValueError(f"Book '{record['book_title']}' not found.")
+            resolved.append((employee, book, record['sale_date'], date_to_ordinal(record['sale_date']),
+                             record['actual_sale_price']))
+        self.insert_sales(resolved)
+        metrics.count('SaleService.add_sales', 'records', len(resolved))
+
+    @instrumented
+    def add_sales_shard(self, shard: SalesShard):
+        employees = []
+        for name in shard.employee_names:
+            employee = self.employee_service.find_employee(name)
+            if employee is None:
+                raise ValueError(f"Employee '{name}' not found.")
+            employees.append(employee)
+        books = []
+        for title in shard.book_titles:
+            book = self.book_service.find_book(title)
+            if book is None:
+                raise ValueError(f"Book '{title}' not found.")
+            books.append(book)
+        dates = shard.dates
+        ordinals = shard.ordinals
+        self.insert_sales([(employees[employee], books[book], dates[day], ordinals[day], price)
+                           for employee, book, day, price
+                           in zip(shard.employee_idx, shard.book_idx, shard.date_idx, shard.prices)])
+        metrics.count('SaleService.add_sales_shard', 'records', len(shard))
+
+    def insert_sales(self, resolved: list):
+        entries = []
+        for employee, book, sale_date, ordinal, actual_sale_price in resolved:
+            if self.columnar:
+                row = self.sales.add(employee, book, ordinal, actual_sale_price)
+            else:
+                row = len(self.sales)
+                self.sales.append(SaleFactory.create_sale(employee, book, sale_date, actual_sale_price))
+            self.totals.add(employee, book, ordinal, actual_sale_price, row)
+            if self.rollups is not None:
+                self.rollups.add(employee, book, ordinal, actual_sale_price)
+            entries.append((ordinal, row))
+        self.index_sales(entries)
+        if self.listeners:
+            self.notify('add_sales', records=[{
+                'employee_name': employee.name,
+                'book_title': book.title,
+                'sale_date': sale_date,
+                'actual_sale_price': actual_sale_price
+            } for employee, book, sale_date, _, actual_sale_price in resolved])
+
+    def detach_index(self):
+        self.sale_ordinals = as_array('i', self.sale_ordinals)
+        self.sale_rows = as_array('i', self.sale_rows)
+
+    def index_sales(self, entries: list):
+        if not entries:
+            return
+        entries.sort()
+        if self.sale_ordinals and self.sale_ordinals[-1] > entries[0][0]:
+            self.index_tail.extend(entries)
+            self.index_sorted = False
+            return
+        self.detach_index()
+        self.sale_ordinals.extend(ordinal for ordinal, _ in entries)
+        self.sale_rows.extend(row for _, row in entries)
+
+    def index_sale(self, row: int, ordinal: int):
+        if self.sale_ordinals and self.sale_ordinals[-1] > ordinal:
+            self.index_tail.append((ordinal, row))
+            self.index_sorted = False
+            return
+        self.detach_index()
+        self.sale_ordinals.append(ordinal)
+        self.sale_rows.append(row)
+
+    def sorted_index(self):
+        if not self.index_sorted:
+            with self.index_lock:
+                if not self.index_sorted:
+                    self.merge_index_tail()
+        return self.sale_ordinals, self.sale_rows
+
+    def merge_index_tail(self):
+        ordinals, rows = self.sale_ordinals, self.sale_rows
+        tail = sorted(self.index_tail)
+        if len(tail) * 8 > len(ordinals):
+            entries = list(zip(ordinals, rows))
+            entries.extend(tail)
+            entries.sort()
+            merged_ordinals = array('i', (ordinal for ordinal, _ in entries))
+            merged_rows = array('i', (row for _, row in entries))
+        else:
+            merged_ordinals = array('i')
+            merged_rows = array('i')
+            position = 0
+            for ordinal, row in tail:
+                first = bisect_left(ordinals, ordinal, position)
+                end = bisect_right(rows, row, first, bisect_right(ordinals, ordinal, first))
+                merged_ordinals.extend(ordinals[position:end])
+                merged_rows.extend(rows[position:end])
+                merged_ordinals.append(ordinal)
+                merged_rows.append(row)
+                position = end
+            merged_ordinals.extend(ordinals[position:])
+            merged_rows.extend(rows[position:])
+        self.sale_ordinals = merged_ordinals
+        self.sale_rows = merged_rows
+        self.index_tail = []
+        self.index_sorted = True
+
+    @instrumented
+    def get_sales_by_date(self, date: str):
+        return self.sales_between(date, date)
 
+    @instrumented
+    def get_sales_by_period(self, start_date: str, end_date: str):
+        return self.sales_between(start_date, end_date)
+
+    def sales_between(self, start_date: str, end_date: str):
+        sale_ordinals, sale_rows = self.sorted_index()
+        start = bisect_left(sale_ordinals, date_to_ordinal(start_date))
+        end = bisect_right(sale_ordinals, date_to_ordinal(end_date))
+        sales = self.sales
+        return [sales[row] for row in sale_rows[start:end]]
+
+    def iter_sales_by_period(self, start_date: str, end_date: str):
+        sale_ordinals, sale_rows = self.sorted_index()
+        start = bisect_left(sale_ordinals, date_to_ordinal(start_date))
+        end = bisect_right(sale_ordinals, date_to_ordinal(end_date))
+        sales = self.sales
+        for position in range(start, end):
+            yield sales[sale_rows[position]]
+
+    @instrumented
+    def get_sales_page(self, start_date: str = None, end_date: str = None, employee_name: str = None,
+                       book_title: str = None, limit: int = 100, after: tuple = None):
+        sale_ordinals, sale_rows = self.sorted_index()
+        first = 0 if start_date is None else bisect_left(sale_ordinals, date_to_ordinal(start_date))
+        last = len(sale_ordinals) if end_date is None else bisect_right(sale_ordinals, date_to_ordinal(end_date))
+        if after is not None:
+            ordinal, row = after
+            day_start = bisect_left(sale_ordinals, ordinal)
+            day_end = bisect_right(sale_ordinals, ordinal, day_start)
+            first = max(first, bisect_right(sale_rows, row, day_start, day_end))
+        sales = self.sales
+        page = []
+        for position in range(first, last if limit > 0 else first):
+            sale = sales[sale_rows[position]]
+            if ((employee_name is None or sale.employee.name == employee_name)
+                    and (book_title is None or sale.book.title == book_title)):
+                page.append(sale)
+                if len(page) >= limit:
+                    return page, (sale_ordinals[position], sale_rows[position])
+        return page, None
+
+    @instrumented
+    def get_sales_by_employee(self, employee_name: str):
+        return list(self.iter_sales_by_employee(employee_name))
+
+    def iter_sales_by_employee(self, employee_name: str):
+        sales = self.sales
+        for row in self.totals.rows_for_employee(employee_name):
+            yield sales[row]
+
+    def get_top_titles(self, top_n: int):
+        titles = self.totals.by_title()
+        top_titles = nlargest(max(top_n, 0), titles, key=lambda title: titles[title][0])
+        return [(title, titles[title][0]) for title in top_titles]
+
+    def get_revenue_totals(self, start_date: str = None, end_date: str = None):
+        if start_date is None and end_date is None:
+            return self.totals.count, self.totals.revenue
+
+        start = date_to_ordinal(start_date) if start_date else None
+        end = date_to_ordinal(end_date) if end_date else None
+        count = 0
+        revenue = 0.0
+        for ordinal, (day_count, day_revenue) in self.totals.by_day.items():
+            if (start is None or ordinal >= start) and (end is None or ordinal <= end):
+                count += day_count
+                revenue += day_revenue
+        return count, revenue
+
+    def get_total_margin(self):
+        return self.totals.margin()
+
+    def rebuild_rollups(self):
+        rollups = SalesRollups()
+        sales = self.sales
+        for ordinal, row in zip(*self.sorted_index()):
+            sale = sales[row]
+            rollups.add(sale.employee, sale.book, ordinal, sale.actual_sale_price)
+        self.rollups = rollups
+
+    @instrumented
+    def get_rollup(self, period: str = 'day', dimension: str = 'total', start_date: str = None,
+                   end_date: str = None):
+        if self.rollups is None:
+            self.rebuild_rollups()
+        return self.rollups.query(period, dimension, start_date, end_date)
+
+    def iter_sales(self):
+        return iter(self.sales)
+
+
+class SQLiteStorage:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            position TEXT,
+            phone TEXT,
+            email TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS employees_active_name ON employees (name) WHERE active = 1;
+        CREATE UNIQUE INDEX IF NOT EXISTS employees_active_email ON employees (email) WHERE active = 1;
+        CREATE INDEX IF NOT EXISTS employees_name ON employees (name);
+
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            year INTEGER,
+            author TEXT NOT NULL,
+            genre TEXT,
+            cost REAL,
+            sale_price REAL,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS books_active_title_author ON books (title, author) WHERE active = 1;
+        CREATE INDEX IF NOT EXISTS books_active_title ON books (title, id) WHERE active = 1;
+
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL REFERENCES employees (id),
+            book_id INTEGER NOT NULL REFERENCES books (id),
+            sale_date TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            actual_sale_price REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sales_ordinal ON sales (ordinal, id);
+        CREATE INDEX IF NOT EXISTS sales_employee ON sales (employee_id, id);
+        CREATE INDEX IF NOT EXISTS sales_book ON sales (book_id);
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+
+EMPLOYEE_COLUMNS = 'name, position, phone, email'
+BOOK_COLUMNS = 'title, year, author, genre, cost, sale_price'
+SALE_QUERY = """
+    SELECT e.id, e.name, e.position, e.phone, e.email,
+           b.id, b.title, b.year, b.author, b.genre, b.cost, b.sale_price,
+           s.sale_date, s.actual_sale_price, s.ordinal, s.id
+    FROM sales s
+    JOIN employees e ON e.id = s.employee_id
+    JOIN books b ON b.id = s.book_id
+"""
+
+
+class SQLiteEmployeeService(ChangeNotifier):
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        self.listeners = []
+
+    def find_employee_id(self, name: str):
+        row = self.storage.connection.execute(
+            "SELECT id FROM employees WHERE name = ? AND active = 1", (name,)).fetchone()
+        return row[0] if row else None
+
+    def check_unique(self, name: str, email: str):
+        if self.storage.connection.execute(
+                "SELECT 1 FROM employees WHERE (name = ? OR email = ?) AND active = 1", (name, email)).fetchone():
+            raise ValueError("Employee with this name or email already exists.")
+
+    @instrumented
+    def add_employee(self, name: str, position: str, phone: str, email: str):
+        self.check_unique(name, email)
+        with self.storage.connection:
+            self.storage.connection.execute(
+                f"INSERT INTO employees ({EMPLOYEE_COLUMNS}) VALUES (?, ?, ?, ?)", (name, position, phone, email))
+        self.notify('add_employee', name=name, position=position, phone=phone, email=email)
+
+    @instrumented
+    def add_employees(self, records):
+        rows = [(record['name'], record['position'], record['phone'], record['email']) for record in records]
+        try:
+            with self.storage.connection:
+                self.storage.connection.executemany(
+                    f"INSERT INTO employees ({EMPLOYEE_COLUMNS}) VALUES (?, ?, ?, ?)", rows)
+        except sqlite3.IntegrityError:
+            raise ValueError("Employee with this name or email already exists.")
+        metrics.count('SQLiteEmployeeService.add_employees', 'records', len(rows))
+        if self.listeners:
+            self.notify('add_employees', records=[dict(zip(('name', 'position', 'phone', 'email'), row))
+                                                  for row in rows])
+
+    def find_employee(self, name: str):
+        row = self.storage.connection.execute(
+            f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE name = ? AND active = 1", (name,)).fetchone()
+        return EmployeeFactory.create_employee(*row) if row else None
+
+    @instrumented
+    def remove_employee(self, name: str):
+        with self.storage.connection:
+            removed = self.storage.connection.execute(
+                "UPDATE employees SET active = 0 WHERE name = ? AND active = 1", (name,)).rowcount
+        if not removed:
+            print(f"Employee with name '{name}' not found.")
+            return
+        self.notify('remove_employee', name=name)
+
+    def get_all_employees(self):
+        return list(self.iter_employees())
+
+    def iter_employees(self, position: str = None, offset: int = 0, limit: int = None):
+        where, params = ("AND position = ?", (position,)) if position is not None else ('', ())
+        rows = self.storage.connection.execute(
+            f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE active = 1 {where} ORDER BY id LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset))
+        for row in rows:
+            yield EmployeeFactory.create_employee(*row)
+
+    @instrumented
+    def edit_employee(self, name: str, new_position: str = None, new_phone: str = None, new_email: str = None):
+        employee = self.find_employee(name)
+        if employee is None:
+            raise ValueError("Employee not found")
+        if new_email and new_email != employee.email:
+            if self.storage.connection.execute(
+                    "SELECT 1 FROM employees WHERE email = ? AND active = 1", (new_email,)).fetchone():
+                raise ValueError("Employee with this email already exists.")
+            employee.email = new_email
+        if new_position:
+            employee.position = new_position
+        if new_phone:
+            employee.phone = new_phone
+        with self.storage.connection:
+            self.storage.connection.execute(
+                "UPDATE employees SET position = ?, phone = ?, email = ? WHERE name = ? AND active = 1",
+                (employee.position, employee.phone, employee.email, name))
+        self.notify('edit_employee', name=name, new_position=new_position, new_phone=new_phone, new_email=new_email)
+        return employee
+
+
+class SQLiteBookService(ChangeNotifier):
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        self.listeners = []
+
+    def find_book_id(self, title: str):
+        row = self.storage.connection.execute(
+            "SELECT id FROM books WHERE title = ? AND active = 1 ORDER BY id LIMIT 1", (title,)).fetchone()
+        return row[0] if row else None
+
+    @instrumented
+    def add_book(self, title: str, year: int, author: str, genre: str, cost: float, sale_price: float):
+        if self.find_book(title, author) is not None:
+            raise ValueError("Book with this title and author already exists.")
+        with self.storage.connection:
+            self.storage.connection.execute(
+                f"INSERT INTO books ({BOOK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                (title, year, author, genre, cost, sale_price))
+        self.notify('add_book', title=title, year=year, author=author, genre=genre, cost=cost, sale_price=sale_price)
+
+    @instrumented
+    def add_books(self, records):
+        rows = [(record['title'], record['year'], record['author'], record['genre'], record['cost'],
+                 record['sale_price']) for record in records]
+        try:
+            with self.storage.connection:
+                self.storage.connection.executemany(
+                    f"INSERT INTO books ({BOOK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.IntegrityError:
+            raise ValueError("Book with this title and author already exists.")
+        metrics.count('SQLiteBookService.add_books', 'records', len(rows))
+        if self.listeners:
+            self.notify('add_books', records=[dict(zip(('title', 'year', 'author', 'genre', 'cost', 'sale_price'), row))
+                                              for row in rows])
+
+    def find_book(self, title: str, author: str = None):
+        if author is not None:
+            row = self.storage.connection.execute(
+                f"SELECT {BOOK_COLUMNS} FROM books WHERE title = ? AND author = ? AND active = 1",
+                (title, author)).fetchone()
+        else:
+            row = self.storage.connection.execute(
+                f"SELECT {BOOK_COLUMNS} FROM books WHERE title = ? AND active = 1 ORDER BY id LIMIT 1",
+                (title,)).fetchone()
+        return BookFactory.create_book(*row) if row else None
+
+    @instrumented
+    def remove_book(self, title: str):
+        book_id = self.find_book_id(title)
+        if book_id is None:
+            print(f"Book with title '{title}' not found.")
+            return
+        with self.storage.connection:
+            self.storage.connection.execute("UPDATE books SET active = 0 WHERE id = ?", (book_id,))
+        self.notify('remove_book', title=title)
+
+    @instrumented
+    def edit_book(self, title: str, new_year: int = None, new_author: str = None, new_genre: str = None,
+                  new_cost: float = None, new_sale_price: float = None):
+        book_id = self.find_book_id(title)
+        if book_id is None:
+            raise ValueError("Book not found")
+        book = self.find_book(title)
+        if new_author and new_author != book.author:
+            if self.find_book(title, new_author) is not None:
+                raise ValueError("Book with this title and author already exists.")
+            book.author = new_author
+        if new_year:
+            book.year = new_year
+        if new_genre:
+            book.genre = new_genre
+        if new_cost:
+            book.cost = new_cost
+        if new_sale_price:
+            book.sale_price = new_sale_price
+        with self.storage.connection:
+            self.storage.connection.execute(
+                "UPDATE books SET year = ?, author = ?, genre = ?, cost = ?, sale_price = ? WHERE id = ?",
+                (book.year, book.author, book.genre, book.cost, book.sale_price, book_id))
+        self.notify('edit_book', title=title, new_year=new_year, new_author=new_author, new_genre=new_genre,
+                    new_cost=new_cost, new_sale_price=new_sale_price)
+        return book
+
+    @instrumented
+    def search_books(self, prefix: str = None, text: str = None, author: str = None, genre: str = None,
+                     min_year: int = None, max_year: int = None, min_price: float = None, max_price: float = None,
+                     offset: int = 0, limit: int = 20):
+        def escape(value: str):
+            return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+        conditions = ["active = 1"]
+        params = []
+        if prefix:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            params.append(escape(prefix) + '%')
+        if text:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            params.append('%' + escape(text) + '%')
+        for condition, value in (("author = ? COLLATE NOCASE", author), ("genre = ? COLLATE NOCASE", genre),
+                                 ("year >= ?", min_year), ("year <= ?", max_year),
+                                 ("sale_price >= ?", min_price), ("sale_price <= ?", max_price)):
+            if value is not None and value != '':
+                conditions.append(condition)
+                params.append(value)
+        rows = self.storage.connection.execute(
+            f"SELECT {BOOK_COLUMNS} FROM books WHERE {' AND '.join(conditions)} "
+            f"ORDER BY title COLLATE NOCASE, id LIMIT ? OFFSET ?", (*params, limit, offset))
+        return [BookFactory.create_book(*row) for row in rows]
+
+    def get_all_books(self):
+        return list(self.iter_books())
+
+    def iter_books(self, genre: str = None, author: str = None, offset: int = 0, limit: int = None):
+        conditions = ["active = 1"]
+        params = []
+        for column, value in (('genre', genre), ('author', author)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        rows = self.storage.connection.execute(
+            f"SELECT {BOOK_COLUMNS} FROM books WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset))
+        for row in rows:
+            yield BookFactory.create_book(*row)
+
+
+class SQLiteSaleService(ChangeNotifier):
+    def __init__(self, storage: SQLiteStorage, employee_service: SQLiteEmployeeService,
+                 book_service: SQLiteBookService):
+        self.storage = storage
+        self.listeners = []
+        self.employee_service = employee_service
+        self.book_service = book_service
+
+    def resolve(self, employee_name: str, book_title: str, sale_date: str, actual_sale_price: float):
+        employee_id = self.employee_service.find_employee_id(employee_name)
+        if employee_id is None:
+            raise ValueError(f"Employee '{employee_name}' not found.")
+        book_id = self.book_service.find_book_id(book_title)
+        if book_id is None:
+            raise ValueError(f"Book '{book_title}' not found.")
+        return employee_id, book_id, sale_date, date_to_ordinal(sale_date), actual_sale_price
+
+    @instrumented
+    def add_sale(self, employee_name: str, book_title: str, sale_date: str, actual_sale_price: float):
+        row = self.resolve(employee_name, book_title, sale_date, actual_sale_price)
+        with self.storage.connection:
+            self.storage.connection.execute(
+                "INSERT INTO sales (employee_id, book_id, sale_date, ordinal, actual_sale_price) "
+                "VALUES (?, ?, ?, ?, ?)", row)
+        self.notify('add_sale', employee_name=employee_name, book_title=book_title, sale_date=sale_date,
+                    actual_sale_price=actual_sale_price)
+
+    @instrumented
+    def add_sales(self, records):
+        records = list(records)
+        rows = [self.resolve(record['employee_name'], record['book_title'], record['sale_date'],
+                             record['actual_sale_price']) for record in records]
+        with self.storage.connection:
+            self.storage.connection.executemany(
+                "INSERT INTO sales (employee_id, book_id, sale_date, ordinal, actual_sale_price) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        metrics.count('SQLiteSaleService.add_sales', 'records', len(rows))
+        if self.listeners:
+            self.notify('add_sales', records=records)
+
+    @instrumented
+    def add_sales_shard(self, shard: SalesShard):
+        employee_ids = []
+        for name in shard.employee_names:
+            employee_id = self.employee_service.find_employee_id(name)
+            if employee_id is None:
+                raise ValueError(f"Employee '{name}' not found.")
+            employee_ids.append(employee_id)
+        book_ids = []
+        for title in shard.book_titles:
+            book_id = self.book_service.find_book_id(title)
+            if book_id is None:
+                raise ValueError(f"Book '{title}' not found.")
+            book_ids.append(book_id)
+        dates = shard.dates
+        ordinals = shard.ordinals
+        with self.storage.connection:
+            self.storage.connection.executemany(
+                "INSERT INTO sales (employee_id, book_id, sale_date, ordinal, actual_sale_price) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((employee_ids[employee], book_ids[book], dates[day], ordinals[day], price)
+                 for employee, book, day, price
+                 in zip(shard.employee_idx, shard.book_idx, shard.date_idx, shard.prices)))
+        metrics.count('SQLiteSaleService.add_sales_shard', 'records', len(shard))
+        if self.listeners:
+            self.notify('add_sales', records=list(shard.records()))
+
+    def query_sales(self, where: str = '', params: tuple = (), order: str = 's.id', keys: bool = False):
+        employees = {}
+        books = {}
+        for row in self.storage.connection.execute(f"{SALE_QUERY} {where} ORDER BY {order}", params):
+            employee = employees.get(row[0])
+            if employee is None:
+                employee = employees[row[0]] = EmployeeFactory.create_employee(*row[1:5])
+            book = books.get(row[5])
+            if book is None:
+                book = books[row[5]] = BookFactory.create_book(*row[6:12])
+            sale = SaleFactory.create_sale(employee, book, row[12], row[13])
+            yield (sale, (row[14], row[15])) if keys else sale
+
+    def period_filter(self, start_date: str = None, end_date: str = None, column: str = 's.ordinal'):
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append(f"{column} >= ?")
+            params.append(date_to_ordinal(start_date))
+        if end_date:
+            conditions.append(f"{column} <= ?")
+            params.append(date_to_ordinal(end_date))
+        return ("WHERE " + " AND ".join(conditions) if conditions else ''), tuple(params)
+
+    @instrumented
     def get_sales_by_date(self, date: str):
-        result = []
-        for sale in self.sales:
-            if sale.sale_date == date:
-                result.append(sale)
-        return result
+        return list(self.iter_sales_by_period(date, date))
 
+    @instrumented
     def get_sales_by_period(self, start_date: str, end_date: str):
-        result = []
-        for sale in self.sales:
-            if start_date <= sale.sale_date <= end_date:
-                result.append(sale)
-        return result
+        return list(self.iter_sales_by_period(start_date, end_date))
+
+    def iter_sales_by_period(self, start_date: str, end_date: str):
+        where, params = self.period_filter(start_date, end_date)
+        return self.query_sales(where, params, 's.ordinal, s.id')
+
+    @instrumented
+    def get_sales_page(self, start_date: str = None, end_date: str = None, employee_name: str = None,
+                       book_title: str = None, limit: int = 100, after: tuple = None):
+        where, params = self.period_filter(start_date, end_date)
+        conditions = [where[len("WHERE "):]] if where else []
+        params = list(params)
+        for condition, value in (("e.name = ?", employee_name), ("b.title = ?", book_title)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if after is not None:
+            conditions.append("(s.ordinal, s.id) > (?, ?)")
+            params.extend(after)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ''
+        rows = list(self.query_sales(where, (*params, max(limit, 0)), 's.ordinal, s.id LIMIT ?', keys=True))
+        page = [sale for sale, _ in rows]
+        return page, (rows[-1][1] if rows and len(rows) >= limit else None)
+
+    @instrumented
+    def get_sales_by_employee(self, employee_name: str):
+        return list(self.iter_sales_by_employee(employee_name))
+
+    def iter_sales_by_employee(self, employee_name: str):
+        return self.query_sales("WHERE s.employee_id IN (SELECT id FROM employees WHERE name = ?)",
+                                (employee_name,))
+
+    def get_top_titles(self, top_n: int):
+        rows = self.storage.connection.execute(
+            "SELECT b.title, COUNT(*) AS sold, MIN(s.id) AS first_sale FROM sales s JOIN books b ON b.id = s.book_id "
+            "GROUP BY b.title ORDER BY sold DESC, first_sale LIMIT ?", (max(top_n, 0),))
+        return [(title, count) for title, count, _ in rows]
+
+    def get_revenue_totals(self, start_date: str = None, end_date: str = None):
+        where, params = self.period_filter(start_date, end_date, 'ordinal')
+        return self.storage.connection.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(actual_sale_price), 0.0) FROM sales {where}", params).fetchone()
+
+    def get_total_margin(self):
+        return self.storage.connection.execute(
+            "SELECT COALESCE(SUM(s.actual_sale_price - b.cost), 0.0) FROM sales s "
+            "JOIN books b ON b.id = s.book_id").fetchone()[0]
+
+    @instrumented
+    def get_rollup(self, period: str = 'day', dimension: str = 'total', start_date: str = None,
+                   end_date: str = None):
+        columns = {'total': 'NULL', 'employee': 'e.name', 'book': 'b.title', 'genre': 'b.genre'}
+        if dimension not in columns:
+            raise ValueError(f"Unknown rollup dimension '{dimension}'.")
+        where, params = self.period_filter(start_date, end_date)
+        rows = self.storage.connection.execute(
+            f"SELECT s.ordinal, {columns[dimension]}, COUNT(*), SUM(s.actual_sale_price), "
+            f"SUM(s.actual_sale_price - b.cost) FROM sales s "
+            f"JOIN employees e ON e.id = s.employee_id JOIN books b ON b.id = s.book_id {where} "
+            f"GROUP BY s.ordinal, {columns[dimension]} ORDER BY s.ordinal", params)
+        return SalesRollups.combine(rows, period, dimension)
+
+    def iter_sales(self):
+        return self.query_sales()
+
+
+class BinarySnapshot:
+    MAGIC = b'BKSNAP01'
+    HEADER = struct.Struct('<8sI')
+    SECTION = struct.Struct('<16sQQ')
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = self.HEADER.unpack_from(self.buffer)
+        if magic != self.MAGIC:
+            raise ValueError(f"'{path}' is not a binary snapshot.")
+        self.sections = {}
+        for position in range(self.HEADER.size, self.HEADER.size + count * self.SECTION.size, self.SECTION.size):
+            name, offset, size = self.SECTION.unpack_from(self.buffer, position)
+            self.sections[name.rstrip(b'\0').decode()] = (offset, size)
+        self.meta = json.loads(bytes(self.column('meta')))
+        if self.meta['byteorder'] != sys.byteorder:
+            raise ValueError(f"'{path}' was written on a {self.meta['byteorder']}-endian machine.")
+
+    @classmethod
+    def write(cls, f, sections: list):
+        position = offset = cls.HEADER.size + cls.SECTION.size * len(sections)
+        table = []
+        for name, data in sections:
+            offset += -offset % 8
+            size = len(data) * data.itemsize if isinstance(data, array) else len(data)
+            table.append((offset, size))
+            offset += size
+        f.write(cls.HEADER.pack(cls.MAGIC, len(sections)))
+        for (name, _), (offset, size) in zip(sections, table):
+            f.write(cls.SECTION.pack(name.encode(), offset, size))
+        for (_, data), (offset, size) in zip(sections, table):
+            f.write(b'\0' * (offset - position))
+            f.write(data)
+            position = offset + size
+
+    def column(self, name: str, typecode: str = 'B'):
+        offset, size = self.sections[name]
+        return memoryview(self.buffer)[offset:offset + size].cast(typecode)
+
+    def strings(self):
+        blob = self.column('strings')
+        offsets = self.column('string_offsets', 'q')
+        return [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(len(offsets) - 1)]
+
+    def employee_records(self):
+        strings = self.strings()
+        fields = self.column('employees', 'i')
+        return [dict(zip(('name', 'position', 'phone', 'email'), (strings[field] for field in fields[i:i + 4])))
+                for i in range(0, len(fields), 4)]
+
+    def book_records(self):
+        strings = self.strings()
+        fields = self.column('books', 'i')
+        return [{'title': strings[fields[3 * i]], 'year': year, 'author': strings[fields[3 * i + 1]],
+                 'genre': strings[fields[3 * i + 2]], 'cost': cost, 'sale_price': sale_price}
+                for i, (year, cost, sale_price) in enumerate(zip(self.column('book_years', 'i'),
+                                                                 self.column('book_costs', 'd'),
+                                                                 self.column('book_prices', 'd')))]
+
+    def sale_store(self, employees: list, books: list) -> SaleStore:
+        return SaleStore.from_columns(employees, books, self.column('sale_employees', 'i'),
+                                      self.column('sale_books', 'i'), self.column('sale_ordinals', 'i'),
+                                      self.column('sale_prices', 'd'))
+
+    def sale_totals(self, employees: list, books: list) -> SalesTotals:
+        totals = SalesTotals()
+        totals.count = self.meta['sales']
+        totals.revenue = self.meta['revenue']
+        for index, entities, counts, revenue in (
+                (totals.by_book, books, self.column('book_sales', 'q'), self.column('book_revenue', 'd')),
+                (totals.by_employee, employees, self.column('employee_sales', 'q'),
+                 self.column('employee_revenue', 'd'))):
+            for entity, count, total in zip(entities, counts, revenue):
+                if count:
+                    index[entity] = [count, total]
+        totals.by_day = {ordinal: [count, revenue] for ordinal, count, revenue in zip(
+            self.column('day_ordinals', 'i'), self.column('day_sales', 'q'), self.column('day_revenue', 'd'))}
+        rows = self.column('employee_rows', 'i')
+        offsets = self.column('employee_offsets', 'q')
+        for employee, start, end in zip(employees, offsets, offsets[1:]):
+            if start < end:
+                totals.employee_rows[employee] = rows[start:end]
+        return totals
 
 
 class DataManager:
-    def __init__(self, employee_service: EmployeeService, book_service: BookService, sale_service: SaleService):
+    def __init__(self, employee_service: EmployeeService, book_service: BookService, sale_service: SaleService,
+                 journal_file: str = None, compact_threshold: int = 10000, rollup_file: str = None):
         self.employee_service = employee_service
         self.book_service = book_service
         self.sale_service = sale_service
-
-    def load_data(self, employee_file: str, book_file: str, sale_file: str):
-
+        self.journal = Journal(journal_file) if journal_file else None
+        self.compact_threshold = compact_threshold
+        self.rollup_file = rollup_file
+        self.replaying = False
+        if self.journal is not None:
+            for service in (employee_service, book_service, sale_service):
+                service.listeners.append(self.record_change)
+
+    def persists_rollups(self) -> bool:
+        return self.rollup_file is not None and isinstance(self.sale_service, SaleService)
+
+    def close(self):
+        if self.journal is not None:
+            for service in (self.employee_service, self.book_service, self.sale_service):
+                if self.record_change in service.listeners:
+                    service.listeners.remove(self.record_change)
+            self.journal.close()
+
+    def record_change(self, op: str, args: dict):
+        if not self.replaying:
+            self.journal.append(op, args)
+
+    @instrumented
+    def load_data(self, employee_file: str, book_file: str, sale_file, batch_size: int = 1000,
+                  workers: int = 1):
+        self.replaying = True
+        try:
+            if self.journal is not None:
+                self.journal.recover()
+            if self.journal is None or os.path.exists(employee_file):
+                if self.persists_rollups():
+                    self.sale_service.rollups = None
+                self.load_snapshot(employee_file, book_file, sale_file, batch_size, workers)
+                if self.persists_rollups():
+                    self.load_rollups()
+            if self.journal is not None:
+                self.replay_journal()
+        finally:
+            self.replaying = False
+
+    def replay_journal(self):
+        services = {
+            'employee': self.employee_service,
+            'employees': self.employee_service,
+            'book': self.book_service,
+            'books': self.book_service,
+            'sale': self.sale_service,
+            'sales': self.sale_service
+        }
+        for record in self.journal.replay():
+            service = services[record['op'].rsplit('_', 1)[1]]
+            getattr(service, record['op'])(**record['args'])
+
+    def load_snapshot(self, employee_file: str, book_file: str, sale_file, batch_size: int, workers: int = 1):
         with open(employee_file, 'r') as f:
-            employee_data = json.load(f)
-            for emp in employee_data:
-                self.employee_service.add_employee(emp['name'], emp['position'], emp['phone'], emp['email'])
+            for batch in iter_batches(iter_json_records(f), batch_size):
+                self.employee_service.add_employees(batch)
+                metrics.count('DataManager.load_data', 'records', len(batch))
+        metrics.count('DataManager.load_data', 'bytes_read', os.path.getsize(employee_file))
 
         with open(book_file, 'r') as f:
-            book_data = json.load(f)
-            for book in book_data:
-                self.book_service.add_book(book['title'], book['year'], book['author'], book['genre'], book['cost'], book['sale_price'])
-
-        with open(sale_file, 'r') as f:
-            sale_data = json.load(f)
-            for sale in sale_data:
-                self.sale_service.add_sale(sale['employee_name'], sale['book_title'], sale['sale_date'], sale['actual_sale_price'])
-
+            for batch in iter_batches(iter_json_records(f), batch_size):
+                self.book_service.add_books(batch)
+                metrics.count('DataManager.load_data', 'records', len(batch))
+        metrics.count('DataManager.load_data', 'bytes_read', os.path.getsize(book_file))
+
+        sale_files = expand_paths(sale_file)
+        if workers > 1 and len(sale_files) > 1:
+            self.load_sales_shards(sale_files, workers)
+            return
+        for path in sale_files:
+            with open(path, 'r') as f:
+                for batch in iter_batches(iter_json_records(f), batch_size):
+                    self.sale_service.add_sales(batch)
+                    metrics.count('DataManager.load_data', 'records', len(batch))
+            metrics.count('DataManager.load_data', 'bytes_read', os.path.getsize(path))
+
+    def load_rollups(self):
+        rollups = None
+        if os.path.exists(self.rollup_file):
+            with open(self.rollup_file, 'r') as f:
+                data = json.load(f)
+            metrics.count('DataManager.load_data', 'bytes_read', os.path.getsize(self.rollup_file))
+            totals = self.sale_service.totals
+            employees = {employee.name: employee for employee in totals.by_employee}
+            books = {book.title: book for book in totals.by_book}
+            if len(employees) == len(totals.by_employee) and len(books) == len(totals.by_book):
+                try:
+                    rollups = SalesRollups.from_dict(data, employees, books)
+                except (KeyError, TypeError, ValueError):
+                    rollups = None
+        if rollups is None or rollups.count != self.sale_service.totals.count:
+            self.sale_service.rebuild_rollups()
+        else:
+            self.sale_service.rollups = rollups
+
+    def write_rollups(self, f):
+        if self.sale_service.rollups is None:
+            self.sale_service.rebuild_rollups()
+        json.dump(self.sale_service.rollups.to_dict(), f)
+
+    def load_sales_shards(self, sale_files: list, workers: int):
+        with ProcessPoolExecutor(max_workers=min(workers, len(sale_files))) as pool:
+            for path, shard in zip(sale_files, pool.map(parse_sales_shard, sale_files)):
+                self.sale_service.add_sales_shard(shard)
+                metrics.count('DataManager.load_data', 'records', len(shard))
+                metrics.count('DataManager.load_data', 'bytes_read', os.path.getsize(path))
+
+    @instrumented
     def save_data(self, employee_file: str, book_file: str, sale_file: str):
-
-        employees = self.employee_service.get_all_employees()
-        employee_dicts = []
-        for emp in employees:
-            employee_dicts.append({
-                'name': emp.name,
-                'position': emp.position,
-                'phone': emp.phone,
-                'email': emp.email
-            })
-        with open(employee_file, 'w') as f:
-            json.dump(employee_dicts, f)
-
-        books = self.book_service.get_all_books()
-        book_dicts = []
+        if self.journal is None:
+            for path, write in self.snapshot_writers(employee_file, book_file, sale_file):
+                write_file_atomically(path, write)
+                metrics.count('DataManager.save_data', 'bytes_written', os.path.getsize(path))
+            return
+
+        self.journal.sync()
+        if self.journal.records_since_checkpoint >= self.compact_threshold:
+            self.compact(employee_file, book_file, sale_file)
+
+    @instrumented
+    def compact(self, employee_file: str, book_file: str, sale_file: str):
+        self.journal.sync()
+        pending = [(write_temp_file(path, write), path)
+                   for path, write in self.snapshot_writers(employee_file, book_file, sale_file)]
+        self.journal.write_checkpoint(self.journal.seq, pending)
+        for temp_path, path in pending:
+            os.replace(temp_path, path)
+            metrics.count('DataManager.compact', 'bytes_written', os.path.getsize(path))
+        self.journal.write_checkpoint(self.journal.seq)
+        self.journal.reset()
+
+    @instrumented
+    def save_binary(self, path: str):
+        if self.journal is not None:
+            raise ValueError("Binary snapshots cannot be combined with a journal.")
+        if not isinstance(self.sale_service, SaleService):
+            raise ValueError("Binary snapshots can only be saved from the in-memory sale service.")
+        write_file_atomically(path, lambda f: BinarySnapshot.write(f, self.binary_sections()), 'wb')
+        metrics.count('DataManager.save_binary', 'bytes_written', os.path.getsize(path))
+        if self.persists_rollups():
+            write_file_atomically(self.rollup_file, self.write_rollups)
+
+    def binary_sections(self) -> list:
+        employees = list(self.employee_service.get_all_employees())
+        books = list(self.book_service.get_all_books())
+        active_employees = len(employees)
+        active_books = len(books)
+        employee_ids = {employee: employee_id for employee_id, employee in enumerate(employees)}
+        book_ids = {book: book_id for book_id, book in enumerate(books)}
+
+        sale_service = self.sale_service
+        sale_employees = array('i')
+        sale_books = array('i')
+        sale_prices = array('d')
+        for sale in sale_service.iter_sales():
+            employee_id = employee_ids.get(sale.employee)
+            if employee_id is None:
+                employee_id = employee_ids[sale.employee] = len(employees)
+                employees.append(sale.employee)
+            book_id = book_ids.get(sale.book)
+            if book_id is None:
+                book_id = book_ids[sale.book] = len(books)
+                books.append(sale.book)
+            sale_employees.append(employee_id)
+            sale_books.append(book_id)
+            sale_prices.append(sale.actual_sale_price)
+        sale_ordinals = array('i', bytes(4 * len(sale_prices)))
+        index_ordinals, index_rows = sale_service.sorted_index()
+        for ordinal, row in zip(index_ordinals, index_rows):
+            sale_ordinals[row] = ordinal
+
+        strings = {}
+        employee_fields = array('i')
+        for employee in employees:
+            employee_fields.extend(strings.setdefault(value, len(strings))
+                                   for value in (employee.name, employee.position, employee.phone, employee.email))
+        book_fields = array('i')
         for book in books:
-            book_dicts.append({
-                'title': book.title,
-                'year': book.year,
-                'author': book.author,
-                'genre': book.genre,
-                'cost': book.cost,
-                'sale_price': book.sale_price
-            })
-        with open(book_file, 'w') as f:
-            json.dump(book_dicts, f)
-
-        sales = self.sale_service.sales
-        sale_dicts = []
-        for sale in sales:
-            sale_dicts.append({
-                'employee_name': sale.employee.name,
-                'book_title': sale.book.title,
-                'sale_date': sale.sale_date,
-                'actual_sale_price': sale.actual_sale_price
-            })
-        with open(sale_file, 'w') as f:
-            json.dump(sale_dicts, f)
+            book_fields.extend(strings.setdefault(value, len(strings))
+                               for value in (book.title, book.author, book.genre))
+        blob = bytearray()
+        string_offsets = array('q', [0])
+        for value in strings:
+            blob += value.encode()
+            string_offsets.append(len(blob))
+
+        totals = sale_service.totals
+        book_sales = array('q', bytes(8 * len(books)))
+        book_revenue = array('d', bytes(8 * len(books)))
+        for book, (count, revenue) in totals.by_book.items():
+            book_sales[book_ids[book]] = count
+            book_revenue[book_ids[book]] = revenue
+        employee_sales = array('q', bytes(8 * len(employees)))
+        employee_revenue = array('d', bytes(8 * len(employees)))
+        for employee, (count, revenue) in totals.by_employee.items():
+            employee_sales[employee_ids[employee]] = count
+            employee_revenue[employee_ids[employee]] = revenue
+        employee_rows = array('i')
+        employee_offsets = array('q', [0])
+        for employee in employees:
+            employee_rows.extend(totals.employee_rows.get(employee, ()))
+            employee_offsets.append(len(employee_rows))
+        days = sorted(totals.by_day)
+
+        meta = {
+            'byteorder': sys.byteorder,
+            'active_employees': active_employees,
+            'active_books': active_books,
+            'sales': totals.count,
+            'revenue': totals.revenue
+        }
+        return [
+            ('meta', json.dumps(meta).encode()),
+            ('strings', blob),
+            ('string_offsets', string_offsets),
+            ('employees', employee_fields),
+            ('books', book_fields),
+            ('book_years', array('i', (book.year for book in books))),
+            ('book_costs', array('d', (book.cost for book in books))),
+            ('book_prices', array('d', (book.sale_price for book in books))),
+            ('sale_employees', sale_employees),
+            ('sale_books', sale_books),
+            ('sale_ordinals', sale_ordinals),
+            ('sale_prices', sale_prices),
+            ('index_ordinals', as_array('i', index_ordinals)),
+            ('index_rows', as_array('i', index_rows)),
+            ('book_sales', book_sales),
+            ('book_revenue', book_revenue),
+            ('employee_sales', employee_sales),
+            ('employee_revenue', employee_revenue),
+            ('day_ordinals', array('i', days)),
+            ('day_sales', array('q', (totals.by_day[day][0] for day in days))),
+            ('day_revenue', array('d', (totals.by_day[day][1] for day in days))),
+            ('employee_rows', employee_rows),
+            ('employee_offsets', employee_offsets)
+        ]
+
+    @instrumented
+    def load_binary(self, path: str):
+        if self.journal is not None:
+            raise ValueError("Binary snapshots cannot be combined with a journal.")
+        snapshot = BinarySnapshot(path)
+        active_employees = snapshot.meta['active_employees']
+        active_books = snapshot.meta['active_books']
+
+        employee_records = snapshot.employee_records()
+        self.employee_service.add_employees(employee_records[:active_employees])
+        employees = [self.employee_service.find_employee(record['name'])
+                     for record in employee_records[:active_employees]]
+        employees.extend(EmployeeFactory.create_employee(**record) for record in employee_records[active_employees:])
+        book_records = snapshot.book_records()
+        self.book_service.add_books(book_records[:active_books])
+        books = [self.book_service.find_book(record['title'], record['author'])
+                 for record in book_records[:active_books]]
+        books.extend(BookFactory.create_book(**record) for record in book_records[active_books:])
+
+        sale_service = self.sale_service
+        store = snapshot.sale_store(employees, books)
+        if isinstance(sale_service, SaleService) and not len(sale_service.sales):
+            sale_service.sales = store
+            sale_service.columnar = True
+            sale_service.sale_ordinals = snapshot.column('index_ordinals', 'i')
+            sale_service.sale_rows = snapshot.column('index_rows', 'i')
+            sale_service.totals = snapshot.sale_totals(employees, books)
+            sale_service.rollups = None
+            sale_service.notify('load_sales')
+        elif isinstance(sale_service, SaleService):
+            for batch in iter_batches(range(len(store)), 1000):
+                sale_service.insert_sales([(store[row].employee, store[row].book, store[row].sale_date,
+                                            store.ordinals[row], store.prices[row]) for row in batch])
+        else:
+            for batch in iter_batches((sale.to_dict() for sale in store), 1000):
+                sale_service.add_sales(batch)
+        if self.persists_rollups():
+            self.load_rollups()
+        metrics.count('DataManager.load_binary', 'records',
+                      len(employee_records) + len(book_records) + snapshot.meta['sales'])
+        metrics.count('DataManager.load_binary', 'bytes_read', os.path.getsize(path))
+
+    def snapshot_writers(self, employee_file: str, book_file: str, sale_file: str):
+        writers = [
+            (employee_file, lambda f: write_json_records(
+                f, (emp.to_dict() for emp in self.employee_service.get_all_employees()),
+                employee_file.endswith('.jsonl'))),
+            (book_file, lambda f: write_json_records(
+                f, (book.to_dict() for book in self.book_service.get_all_books()),
+                book_file.endswith('.jsonl'))),
+            (sale_file, lambda f: write_json_records(
+                f, (sale.to_dict() for sale in self.sale_service.iter_sales()),
+                sale_file.endswith('.jsonl')))
+        ]
+        if self.persists_rollups():
+            writers.append((self.rollup_file, self.write_rollups))
+        return writers
+
+
+class CacheEntry:
+    __slots__ = ('value', 'start', 'end', 'sale_employee', 'employees', 'books')
+
+    def __init__(self, value: str, start: int, end: int, sale_employee: str, employees, books):
+        self.value = value
+        self.start = start
+        self.end = end
+        self.sale_employee = sale_employee
+        self.employees = employees
+        self.books = books
+
+
+class ReportCache:
+    def __init__(self, max_entries: int = 256, max_size: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, key: tuple):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry.value
+
+    def put(self, key: tuple, value: str, start: int = None, end: int = None, sale_employee: str = None,
+            employees=frozenset(), books=frozenset()):
+        if self.max_entries <= 0 or len(value) > self.max_size:
+            return
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = CacheEntry(value, start, end, sale_employee, employees, books)
+            self.size += len(value)
+            while len(self.entries) > self.max_entries or self.size > self.max_size:
+                self.discard(next(iter(self.entries)))
+                self.evictions += 1
+
+    def discard(self, key: tuple):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry.value)
+
+    def invalidate(self, predicate):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if predicate(entry)]:
+                self.discard(key)
+
+    def invalidate_sale(self, employee_name: str, ordinal: int):
+        self.invalidate_sales([(employee_name, ordinal)])
+
+    def invalidate_sales(self, sales):
+        all_ordinals = []
+        by_employee = {}
+        for employee_name, ordinal in sales:
+            all_ordinals.append(ordinal)
+            by_employee.setdefault(employee_name, []).append(ordinal)
+        all_ordinals.sort()
+        for ordinals in by_employee.values():
+            ordinals.sort()
+
+        def covers(entry):
+            ordinals = all_ordinals if entry.sale_employee is None else by_employee.get(entry.sale_employee, ())
+            position = 0 if entry.start is None else bisect_left(ordinals, entry.start)
+            return position < len(ordinals) and (entry.end is None or ordinals[position] <= entry.end)
+
+        self.invalidate(covers)
+
+    def invalidate_employee(self, name: str):
+        self.invalidate(lambda entry: entry.employees is None or name in entry.employees)
+
+    def invalidate_book(self, title: str):
+        self.invalidate(lambda entry: entry.books is None or title in entry.books)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
 
 
 class Report:
-    def __init__(self, employee_service: EmployeeService, book_service: BookService, sale_service: SaleService):
+    def __init__(self, employee_service: EmployeeService, book_service: BookService, sale_service: SaleService,
+                 cache_entries: int = 256, cache_size: int = 8 * 1024 * 1024):
         self.employee_service = employee_service
         self.book_service = book_service
         self.sale_service = sale_service
-
+        self.cache = ReportCache(cache_entries, cache_size)
+        for service in (employee_service, book_service, sale_service):
+            service.listeners.append(self.invalidate)
+
+    def close(self):
+        for service in (self.employee_service, self.book_service, self.sale_service):
+            if self.invalidate in service.listeners:
+                service.listeners.remove(self.invalidate)
+        self.cache.clear()
+
+    def invalidate(self, op: str, args: dict):
+        if op == 'add_sale':
+            self.cache.invalidate_sale(args['employee_name'], date_to_ordinal(args['sale_date']))
+        elif op == 'add_sales':
+            self.cache.invalidate_sales((record['employee_name'], date_to_ordinal(record['sale_date']))
+                                        for record in args['records'])
+        elif op in ('edit_employee', 'remove_employee'):
+            self.cache.invalidate_employee(args['name'])
+        elif op in ('edit_book', 'remove_book'):
+            self.cache.invalidate_book(args['title'])
+        elif op == 'load_sales':
+            self.cache.clear()
+
+    @instrumented
     def generate_sales_report(self, start_date: str, end_date: str):
-        sales = self.sale_service.get_sales_by_period(start_date, end_date)
-        report = []
-        for sale in sales:
-            report.append(f"{sale.sale_date}: {sale.employee.name} sold '{sale.book.title}' for {sale.actual_sale_price}")
-        return "\n".join(report)
+        key = ('sales', start_date, end_date)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
-    def generate_employee_sales_report(self, employee_name: str):
         report = []
-        for sale in self.sale_service.sales:
-            if sale.employee.name == employee_name:
-                report.append(f"{sale.sale_date}: '{sale.book.title}' sold for {sale.actual_sale_price}")
-        if not report:
-            return f"No sales found for employee '{employee_name}'"
+        employees = set()
+        books = set()
+        for sale in self.sale_service.iter_sales_by_period(start_date, end_date):
+            report.append(self.format_sale(sale))
+            employees.add(sale.employee.name)
+            books.add(sale.book.title)
+        result = "\n".join(report)
+        self.cache.put(key, result, date_to_ordinal(start_date), date_to_ordinal(end_date),
+                       employees=employees, books=books)
+        return result
 
-        return "\n".join([f"Sales report for {employee_name}:"] + report)
+    @staticmethod
+    def format_sale(sale) -> str:
+        return f"{sale.sale_date}: {sale.employee.name} sold '{sale.book.title}' for {sale.actual_sale_price}"
+
+    @instrumented
+    def generate_sales_report_page(self, start_date: str = None, end_date: str = None, employee_name: str = None,
+                                   limit: int = 50, after: tuple = None):
+        sales, cursor = self.sale_service.get_sales_page(start_date, end_date, employee_name, limit=limit, after=after)
+        return "\n".join(self.format_sale(sale) for sale in sales), cursor
+
+    def iter_sales_report(self, start_date: str, end_date: str):
+        for sale in self.sale_service.iter_sales_by_period(start_date, end_date):
+            yield self.format_sale(sale)
+
+    @instrumented
+    def write_sales_report(self, f, start_date: str, end_date: str, output_format: str = 'text',
+                           chunk_size: int = 1000):
+        sales = self.sale_service.iter_sales_by_period(start_date, end_date)
+        if output_format == 'text':
+            lines = (self.format_sale(sale) + '\n' for sale in sales)
+        elif output_format == 'jsonl':
+            lines = (json.dumps(sale.to_dict()) + '\n' for sale in sales)
+        elif output_format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['sale_date', 'employee_name', 'book_title', 'actual_sale_price'])
+            rows = ([sale.sale_date, sale.employee.name, sale.book.title, sale.actual_sale_price] for sale in sales)
+            written = 0
+            for chunk in iter_batches(rows, chunk_size):
+                writer.writerows(chunk)
+                written += len(chunk)
+            metrics.count('Report.write_sales_report', 'records', written)
+            return written
+        else:
+            raise ValueError(f"Unknown report format '{output_format}'.")
+
+        written = 0
+        for chunk in iter_batches(lines, chunk_size):
+            f.write(''.join(chunk))
+            written += len(chunk)
+        metrics.count('Report.write_sales_report', 'records', written)
+        return written
+
+    @instrumented
+    def generate_employee_sales_report(self, employee_name: str):
+        key = ('employee_sales', employee_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        report = [f"Sales report for {employee_name}:"]
+        books = set()
+        for sale in self.sale_service.iter_sales_by_employee(employee_name):
+            report.append(f"{sale.sale_date}: '{sale.book.title}' sold for {sale.actual_sale_price}")
+            books.add(sale.book.title)
+        if len(report) == 1:
+            result = f"No sales found for employee '{employee_name}'"
+            self.cache.put(key, result, sale_employee=employee_name, employees={employee_name})
+            return result
+
+        result = "\n".join(report)
+        self.cache.put(key, result, sale_employee=employee_name, employees={employee_name}, books=books)
+        return result
 
+    @instrumented
     def generate_top_books_report(self, top_n: int):
-        book_sales = {}
-        for sale in self.sale_service.sales:
-            if sale.book.title not in book_sales:
-                book_sales[sale.book.title] = 0
-            book_sales[sale.book.title] += 1
-
-        sorted_books = []
-        for book, count in book_sales.items():
-            sorted_books.append((book, count))
-        sorted_books.sort(key=lambda item: item[1], reverse=True)
+        key = ('top_books', top_n)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
+        top_titles = self.sale_service.get_top_titles(top_n)
         report = [f"Top {top_n} selling books:"]
+        for title, count in top_titles:
+            report.append(f"{title}: {count} sales")
+        result = "\n".join(report)
+        self.cache.put(key, result, books={title for title, _ in top_titles})
+        return result
+
+    @instrumented
+    def generate_revenue_summary(self, start_date: str = None, end_date: str = None):
+        key = ('revenue_summary', start_date, end_date)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        count, revenue = self.sale_service.get_revenue_totals(start_date, end_date)
+        if start_date is None and end_date is None:
+            report = ["Revenue summary:",
+                      f"Sales: {count}",
+                      f"Revenue: {round(revenue, 2)}",
+                      f"Margin: {round(self.sale_service.get_total_margin(), 2)}"]
+            result = "\n".join(report)
+            self.cache.put(key, result, books=None)
+            return result
+
+        start = date_to_ordinal(start_date) if start_date else None
+        end = date_to_ordinal(end_date) if end_date else None
+        report = [f"Revenue summary from {start_date or 'the first sale'} to {end_date or 'the last sale'}:",
+                  f"Sales: {count}",
+                  f"Revenue: {round(revenue, 2)}"]
+        result = "\n".join(report)
+        self.cache.put(key, result, start, end)
+        return result
+
+    @instrumented
+    def generate_rollup_report(self, period: str = 'month', dimension: str = 'total', start_date: str = None,
+                               end_date: str = None):
+        key = ('rollup', period, dimension, start_date, end_date)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        rollup = self.sale_service.get_rollup(period, dimension, start_date, end_date)
+        report = [f"Sales by {period}" + ("" if dimension == 'total' else f" and {dimension}") + ":"]
+        for label, buckets in rollup.items():
+            if dimension == 'total':
+                entries = [(None, buckets)]
+            else:
+                entries = sorted(buckets.items(), key=lambda item: str(item[0]))
+            for name, (units, revenue, margin) in entries:
+                prefix = label if name is None else f"{label} {name}"
+                report.append(f"{prefix}: {units} sold, revenue {round(revenue, 2)}, margin {round(margin, 2)}")
+        result = "\n".join(report)
+        start = date_to_ordinal(start_date) if start_date else None
+        end = date_to_ordinal(end_date) if end_date else None
+        self.cache.put(key, result, start, end, books=None)
+        return result
+
+
+class AsyncReadWriteLock:
+    def __init__(self):
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+        self.condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def read(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writer and not self.waiting_writers)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self.condition:
+            self.waiting_writers += 1
+            try:
+                await self.condition.wait_for(lambda: not self.writer and not self.readers)
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+class AsyncBookstore:
+    def __init__(self, employee_service, book_service, sale_service, data_manager: DataManager = None,
+                 report: Report = None, executor=None):
+        self.employee_service = employee_service
+        self.book_service = book_service
+        self.sale_service = sale_service
+        self.owned = []
+        if data_manager is None:
+            data_manager = DataManager(employee_service, book_service, sale_service)
+            self.owned.append(data_manager)
+        if report is None:
+            report = Report(employee_service, book_service, sale_service)
+            self.owned.append(report)
+        self.data_manager = data_manager
+        self.report = report
+        self.executor = executor
+        self.lock = AsyncReadWriteLock()
+
+    def close(self):
+        for resource in self.owned:
+            resource.close()
+        self.owned = []
+
+    async def run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def read(self, func, *args, **kwargs):
+        async with self.lock.read():
+            return await self.run(func, *args, **kwargs)
+
+    async def write(self, func, *args, **kwargs):
+        async with self.lock.write():
+            return await self.run(func, *args, **kwargs)
+
+    async def add_employee(self, name: str, position: str, phone: str, email: str):
+        return await self.write(self.employee_service.add_employee, name, position, phone, email)
+
+    async def add_employees(self, records):
+        return await self.write(self.employee_service.add_employees, list(records))
+
+    async def edit_employee(self, name: str, new_position: str = None, new_phone: str = None, new_email: str = None):
+        return await self.write(self.employee_service.edit_employee, name, new_position, new_phone, new_email)
+
+    async def remove_employee(self, name: str):
+        return await self.write(self.employee_service.remove_employee, name)
+
+    async def add_book(self, title: str, year: int, author: str, genre: str, cost: float, sale_price: float):
+        return await self.write(self.book_service.add_book, title, year, author, genre, cost, sale_price)
+
+    async def add_books(self, records):
+        return await self.write(self.book_service.add_books, list(records))
+
+    async def edit_book(self, title: str, new_year: int = None, new_author: str = None, new_genre: str = None,
+                        new_cost: float = None, new_sale_price: float = None):
+        return await self.write(self.book_service.edit_book, title, new_year, new_author, new_genre,
+                                new_cost, new_sale_price)
+
+    async def remove_book(self, title: str):
+        return await self.write(self.book_service.remove_book, title)
+
+    async def add_sale(self, employee_name: str, book_title: str, sale_date: str, actual_sale_price: float):
+        return await self.write(self.sale_service.add_sale, employee_name, book_title, sale_date, actual_sale_price)
+
+    async def add_sales(self, records):
+        return await self.write(self.sale_service.add_sales, list(records))
+
+    async def find_employee(self, name: str):
+        return await self.read(self.employee_service.find_employee, name)
+
+    async def find_book(self, title: str, author: str = None):
+        return await self.read(self.book_service.find_book, title, author)
+
+    async def search_books(self, prefix: str = None, text: str = None, author: str = None, genre: str = None,
+                           min_year: int = None, max_year: int = None, min_price: float = None,
+                           max_price: float = None, offset: int = 0, limit: int = 20):
+        return await self.read(self.book_service.search_books, prefix, text, author, genre, min_year, max_year,
+                               min_price, max_price, offset, limit)
+
+    async def get_all_employees(self):
+        return await self.read(self.employee_service.get_all_employees)
+
+    async def get_all_books(self):
+        return await self.read(self.book_service.get_all_books)
+
+    async def get_sales_page(self, start_date: str = None, end_date: str = None, employee_name: str = None,
+                             book_title: str = None, limit: int = 100, after: tuple = None):
+        return await self.read(self.sale_service.get_sales_page, start_date, end_date, employee_name, book_title,
+                               limit, after)
+
+    async def get_sales_by_date(self, date: str):
+        return await self.read(self.sale_service.get_sales_by_date, date)
+
+    async def get_sales_by_period(self, start_date: str, end_date: str):
+        return await self.read(self.sale_service.get_sales_by_period, start_date, end_date)
+
+    async def generate_sales_report(self, start_date: str, end_date: str):
+        return await self.read(self.report.generate_sales_report, start_date, end_date)
+
+    async def write_sales_report(self, f, start_date: str, end_date: str, output_format: str = 'text',
+                                 chunk_size: int = 1000):
+        return await self.read(self.report.write_sales_report, f, start_date, end_date, output_format, chunk_size)
+
+    async def generate_sales_report_page(self, start_date: str = None, end_date: str = None,
+                                         employee_name: str = None, limit: int = 50, after: tuple = None):
+        return await self.read(self.report.generate_sales_report_page, start_date, end_date, employee_name, limit,
+                               after)
+
+    async def generate_employee_sales_report(self, employee_name: str):
+        return await self.read(self.report.generate_employee_sales_report, employee_name)
+
+    async def generate_top_books_report(self, top_n: int):
+        return await self.read(self.report.generate_top_books_report, top_n)
+
+    async def generate_revenue_summary(self, start_date: str = None, end_date: str = None):
+        return await self.read(self.report.generate_revenue_summary, start_date, end_date)
+
+    async def generate_rollup_report(self, period: str = 'month', dimension: str = 'total', start_date: str = None,
+                                     end_date: str = None):
+        return await self.read(self.report.generate_rollup_report, period, dimension, start_date, end_date)
+
+    async def load_data(self, employee_file: str, book_file: str, sale_file, **kwargs):
+        return await self.write(self.data_manager.load_data, employee_file, book_file, sale_file, **kwargs)
+
+    async def save_data(self, employee_file: str, book_file: str, sale_file: str):
+        return await self.write(self.data_manager.save_data, employee_file, book_file, sale_file)
+
+    async def load_binary(self, path: str):
+        return await self.write(self.data_manager.load_binary, path)
 
-        for book, count in sorted_books[:top_n]:
-            report.append(f"{book}: {count} sales")
-        return "\n".join(report)
+    async def save_binary(self, path: str):
+        return await self.write(self.data_manager.save_binary, path)
 
 
-employee_service = EmployeeService()
-book_service = BookService()
-sale_service = SaleService(employee_service, book_service)
+if __name__ == "__main__":
+    employee_service = EmployeeService()
+    book_service = BookService()
+    sale_service = SaleService(employee_service, book_service)
 
-data_manager = DataManager(employee_service, book_service, sale_service)
+    data_manager = DataManager(employee_service, book_service, sale_service)
 
-employee_data = [
-    {"name": "John", "position": "Manager", "phone": "111-111", "email": "john@gmail.com"},
-    {"name": "Bruce", "position": "Sales", "phone": "222-222", "email": "bruce@gmail.com"},
-    {"name": "Marta", "position": "Sales", "phone": "333-333", "email": "marta@gmail.com"}
-]
+    employee_data = [
+        {"name": "John", "position": "Manager", "phone": "111-111", "email": "john@gmail.com"},
+        {"name": "Bruce", "position": "Sales", "phone": "222-222", "email": "bruce@gmail.com"},
+        {"name": "Marta", "position": "Sales", "phone": "333-333", "email": "marta@gmail.com"}
+    ]
 
-book_data = [
-    {"title": "Taras Bulba", "year": 1835, "author": "N.V. Gogol", "genre": "Novel", "cost": 10.0, "sale_price": 15.0},
-    {"title": "War and Peace", "year": 1867, "author": "L.N. Tolstoy", "genre": "Novel", "cost": 20.0, "sale_price": 25.0},
-    {"title": "1984", "year": 1949, "author": "G. Orwell", "genre": "Fantasy", "cost": 18.5, "sale_price": 19.5}
-]
+    book_data = [
+        {"title": "Taras Bulba", "year": 1835, "author": "N.V. Gogol", "genre": "Novel", "cost": 10.0, "sale_price": 15.0},
+        {"title": "War and Peace", "year": 1867, "author": "L.N. Tolstoy", "genre": "Novel", "cost": 20.0, "sale_price": 25.0},
+        {"title": "1984", "year": 1949, "author": "G. Orwell", "genre": "Fantasy", "cost": 18.5, "sale_price": 19.5}
+    ]
 
-sale_data = [
-    {"employee_name": "John", "book_title": "1984", "sale_date": "2024-08-30", "actual_sale_price": 19.0},
-    {"employee_name": "John", "book_title": "1984", "sale_date": "2024-08-31", "actual_sale_price": 19.5},
-    {"employee_name": "Bruce", "book_title": "Taras Bulba", "sale_date": "2024-08-29", "actual_sale_price": 14.0},
-    {"employee_name": "Marta", "book_title": "War and Peace", "sale_date": "2024-08-29", "actual_sale_price": 23.4}
-]
+    sale_data = [
+        {"employee_name": "John", "book_title": "1984", "sale_date": "2024-08-30", "actual_sale_price": 19.0},
+        {"employee_name": "John", "book_title": "1984", "sale_date": "2024-08-31", "actual_sale_price": 19.5},
+        {"employee_name": "Bruce", "book_title": "Taras Bulba", "sale_date": "2024-08-29", "actual_sale_price": 14.0},
+        {"employee_name": "Marta", "book_title": "War and Peace", "sale_date": "2024-08-29", "actual_sale_price": 23.4}
+    ]
 
-with open('employees.json', 'w') as f:
-    json.dump(employee_data, f)
+    with open('employees.json', 'w') as f:
+        json.dump(employee_data, f)
 
-with open('books.json', 'w') as f:
-    json.dump(book_data, f)
+    with open('books.json', 'w') as f:
+        json.dump(book_data, f)
 
-with open('sales.json', 'w') as f:
-    json.dump(sale_data, f)
+    with open('sales.json', 'w') as f:
+        json.dump(sale_data, f)
 
-data_manager.load_data('employees.json', 'books.json', 'sales.json')
+    data_manager.load_data('employees.json', 'books.json', 'sales.json')
 
-report = Report(employee_service, book_service, sale_service)
+    report = Report(employee_service, book_service, sale_service)
 
-print("Sales Report from 2024-08-30 to 2024-08-31:")
-print(report.generate_sales_report("2024-08-30", "2024-08-31"))
+    print("Sales Report from 2024-08-30 to 2024-08-31:")
+    print(report.generate_sales_report("2024-08-30", "2024-08-31"))
 
-print("\nEmployee Sales Report for John:")
-print(report.generate_employee_sales_report("John"))
+    print("\nEmployee Sales Report for John:")
+    print(report.generate_employee_sales_report("John"))
 
-print("\nTop 1 Selling Books Report:")
-print(report.generate_top_books_report(1))
+    print("\nTop 1 Selling Books Report:")
+    print(report.generate_top_books_report(1))
 
-data_manager.save_data('employees.json', 'books.json', 'sales.json')
+    data_manager.save_data('employees.json', 'books.json', 'sales.json')
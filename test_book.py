@@ -1,11 +1,28 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
 import unittest
+from datetime import date
 
+from benchmark_book import best_results, compare_results, generate_data, run_benchmarks
 from exam_book import (
+    AsyncBookstore,
+    AsyncReadWriteLock,
     EmployeeService,
     BookService,
     SaleService,
     DataManager,
-    Report
+    Report,
+    SQLiteStorage,
+    SQLiteEmployeeService,
+    SQLiteBookService,
+    SQLiteSaleService,
+    date_to_ordinal,
+    metrics,
+    iter_json_records,
+    write_temp_file
 )
 
 
@@ -36,6 +53,23 @@ class TestEmployeeService(unittest.TestCase):
         self.assertEqual(employee.position, "Senior Manager")
         self.assertEqual(employee.phone, "555-555")
 
+    def test_add_employee_duplicate_email(self):
+        self.service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        with self.assertRaises(ValueError):
+            self.service.add_employee("Bob", "Sales", "555-555", "alice@example.com")
+
+    def test_indexes_follow_edit_and_remove(self):
+        self.service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        with self.assertRaises(ValueError):
+            self.service.edit_employee("Bob", new_email="alice@example.com")
+        self.service.edit_employee("Alice", new_email="alice@new.com")
+        self.service.add_employee("Carol", "Sales", "666-666", "alice@example.com")
+        self.service.remove_employee("Alice")
+        self.assertIsNone(self.service.find_employee("Alice"))
+        self.service.add_employee("Alice", "Manager", "444-444", "alice@new.com")
+        self.assertEqual([e.name for e in self.service.get_all_employees()], ["Bob", "Carol", "Alice"])
+
 
 class TestBookService(unittest.TestCase):
     def setUp(self):
@@ -64,6 +98,107 @@ class TestBookService(unittest.TestCase):
         self.assertEqual(book.cost, 12.0)
         self.assertEqual(book.sale_price, 18.0)
 
+    def test_same_title_different_author(self):
+        self.service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.service.add_book("Test Book", 2020, "Other", "Genre", 10.0, 15.0)
+        self.assertEqual(self.service.find_book("Test Book").author, "Author")
+        self.service.remove_book("Test Book")
+        self.assertEqual(self.service.find_book("Test Book").author, "Other")
+        self.assertIsNone(self.service.find_book("Test Book", "Author"))
+
+    def test_edit_book_author_updates_index(self):
+        self.service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.service.edit_book("Test Book", new_author="New Author")
+        self.assertIsNone(self.service.find_book("Test Book", "Author"))
+        self.service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        with self.assertRaises(ValueError):
+            self.service.add_book("Test Book", 2024, "New Author", "Genre", 10.0, 15.0)
+
+
+class TestBookSearch(unittest.TestCase):
+    RECORDS = [
+        {"title": "The Hobbit", "year": 1937, "author": "Tolkien", "genre": "Fantasy", "cost": 8.0, "sale_price": 12.0},
+        {"title": "The Silmarillion", "year": 1977, "author": "Tolkien", "genre": "Fantasy", "cost": 9.0,
+         "sale_price": 15.0},
+        {"title": "Theogony", "year": -700, "author": "Hesiod", "genre": "Poetry", "cost": 4.0, "sale_price": 6.5},
+        {"title": "A Wizard of Earthsea", "year": 1968, "author": "Le Guin", "genre": "Fantasy", "cost": 7.0,
+         "sale_price": 11.0},
+        {"title": "the hobbit", "year": 2001, "author": "Parody", "genre": "Humor", "cost": 2.0, "sale_price": 3.0},
+        {"title": "100%_Pure", "year": 2020, "author": "Chef", "genre": "Cooking", "cost": 5.0, "sale_price": 9.0}
+    ]
+
+    def titles(self, books):
+        return [(book.title, book.author) for book in books]
+
+    def check_search(self, book_service):
+        self.assertEqual(self.titles(book_service.search_books(prefix="the")),
+                         [("The Hobbit", "Tolkien"), ("the hobbit", "Parody"), ("The Silmarillion", "Tolkien"),
+                          ("Theogony", "Hesiod")])
+        self.assertEqual(self.titles(book_service.search_books(prefix="THE", offset=1, limit=2)),
+                         [("the hobbit", "Parody"), ("The Silmarillion", "Tolkien")])
+        self.assertEqual(self.titles(book_service.search_books(text="EARTH")), [("A Wizard of Earthsea", "Le Guin")])
+        self.assertEqual(self.titles(book_service.search_books(text="ob", author="tolkien")),
+                         [("The Hobbit", "Tolkien")])
+        self.assertEqual(self.titles(book_service.search_books(genre="fantasy", min_year=1950, max_price=12.0)),
+                         [("A Wizard of Earthsea", "Le Guin")])
+        self.assertEqual(self.titles(book_service.search_books(min_price=9.0, max_price=11.0)),
+                         [("100%_Pure", "Chef"), ("A Wizard of Earthsea", "Le Guin")])
+        self.assertEqual(self.titles(book_service.search_books(text="%_p")), [("100%_Pure", "Chef")])
+        self.assertEqual(book_service.search_books(text="zzz"), [])
+        self.assertEqual(len(book_service.search_books(limit=100)), 6)
+
+    def test_search_in_memory_and_sqlite(self):
+        book_service = BookService()
+        self.assertEqual(book_service.search_books(text="hobbit", min_year=1900), [])
+        book_service.add_books(self.RECORDS)
+        self.check_search(book_service)
+
+        storage = SQLiteStorage()
+        self.addCleanup(storage.close)
+        sqlite_book_service = SQLiteBookService(storage)
+        sqlite_book_service.add_books(self.RECORDS)
+        self.check_search(sqlite_book_service)
+
+    def test_bulk_batches_sort_index_lazily(self):
+        book_service = BookService()
+        records = [{"title": f"Book {i:03d}", "year": 2000 + i % 7, "author": "Author", "genre": "Genre",
+                    "cost": 1.0, "sale_price": float(200 - i)} for i in range(200)]
+        book_service.add_books(records[100:])
+        book_service.add_books(records[:100])
+        book_service.add_book("Book 000a", 1999, "Author", "Genre", 1.0, 0.5)
+        self.assertFalse(book_service.catalog.index_sorted)
+        book_service.edit_book("Book 150", new_sale_price=0.25)
+        self.assertTrue(book_service.catalog.index_sorted)
+        book_service.add_books([dict(record, author="Other") for record in records[:70]])
+        self.assertEqual([book.title for book in book_service.search_books(prefix="book 00", author="author")],
+                         ["Book 000", "Book 000a", "Book 001", "Book 002", "Book 003", "Book 004", "Book 005",
+                          "Book 006", "Book 007", "Book 008", "Book 009"])
+        self.assertEqual(self.titles(book_service.search_books(max_price=0.5, limit=5)),
+                         [("Book 000a", "Author"), ("Book 150", "Author")])
+        self.assertEqual(len(book_service.books), 271)
+
+    def test_indexes_follow_edits_and_removals(self):
+        book_service = BookService()
+        for record in self.RECORDS:
+            book_service.add_book(**record)
+        book_service.edit_book("The Hobbit", new_author="J. R. R. Tolkien", new_genre="Classic", new_sale_price=20.0)
+        self.assertEqual(self.titles(book_service.search_books(author="Tolkien")), [("The Silmarillion", "Tolkien")])
+        self.assertEqual(self.titles(book_service.search_books(genre="classic", min_price=20.0)),
+                         [("The Hobbit", "J. R. R. Tolkien")])
+        book_service.remove_book("The Hobbit")
+        self.assertEqual(self.titles(book_service.search_books(text="hobbit")), [("the hobbit", "Parody")])
+        self.assertEqual(book_service.search_books(genre="classic"), [])
+        self.assertEqual(len(book_service.get_all_books()), 5)
+
+    def test_large_catalog_pages(self):
+        book_service = BookService()
+        book_service.add_books({"title": f"Title {i:05d}", "year": 1900 + i % 100, "author": f"Author {i % 50}",
+                                "genre": "Genre", "cost": 1.0, "sale_price": float(i % 30)} for i in range(20000))
+        page = book_service.search_books(prefix="title 012", offset=10, limit=5)
+        self.assertEqual([book.title for book in page], [f"Title 012{i:02d}" for i in range(10, 15)])
+        page = book_service.search_books(text="99", author="author 49", min_year=1999)
+        self.assertEqual([book.title for book in page], [f"Title {i:05d}" for i in range(99, 2000, 100)])
+
 
 class TestSaleService(unittest.TestCase):
     def setUp(self):
@@ -80,6 +215,56 @@ class TestSaleService(unittest.TestCase):
         self.assertEqual(sales[0].employee.name, "Alice")
         self.assertEqual(sales[0].book.title, "Test Book")
 
+    def test_out_of_order_sales_defer_index_sort(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        for day, price in ((30, 1.0), (28, 2.0), (29, 3.0), (28, 4.0)):
+            self.sale_service.add_sale("Alice", "Test Book", f"2024-08-{day}", price)
+        self.assertFalse(self.sale_service.index_sorted)
+        sales = self.sale_service.get_sales_by_period("2024-08-28", "2024-08-29")
+        self.assertEqual([sale.actual_sale_price for sale in sales], [2.0, 4.0, 3.0])
+        self.assertTrue(self.sale_service.index_sorted)
+
+    def test_late_sales_between_queries(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.sale_service.add_sales([{"employee_name": "Alice", "book_title": "Test Book",
+                                      "sale_date": f"2024-08-{day // 2 + 1:02d}", "actual_sale_price": float(day)}
+                                     for day in range(40)])
+        for day in (15, 3, 15, 9):
+            self.sale_service.add_sale("Alice", "Test Book", f"2024-08-{day:02d}", 100.0 + day)
+            self.assertEqual(len(self.sale_service.index_tail), 1)
+            sales = self.sale_service.get_sales_by_date(f"2024-08-{day:02d}")
+            self.assertEqual(sales[-1].actual_sale_price, 100.0 + day)
+            self.assertEqual(self.sale_service.index_tail, [])
+        ordinals, rows = self.sale_service.sorted_index()
+        self.assertEqual(list(zip(ordinals, rows)), sorted(zip(ordinals, rows)))
+        self.assertEqual([sale.actual_sale_price for sale in self.sale_service.get_sales_by_date("2024-08-15")],
+                         [28.0, 29.0, 115.0, 115.0])
+
+    def test_add_sale_unknown_employee_or_book(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        with self.assertRaises(ValueError):
+            self.sale_service.add_sale("Bob", "Test Book", "2024-08-30", 14.0)
+        with self.assertRaises(ValueError):
+            self.sale_service.add_sale("Alice", "Other Book", "2024-08-30", 14.0)
+
+    def test_add_sale_after_edit_and_remove(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.book_service.add_book("Test Book", 2024, "Other", "Genre", 10.0, 15.0)
+        self.employee_service.edit_employee("Alice", new_email="alice@new.com")
+        self.book_service.edit_book("Test Book", new_author="New Author")
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        self.assertEqual(self.sale_service.sales[0].book.author, "New Author")
+        self.book_service.remove_book("Test Book")
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 14.0)
+        self.assertEqual(self.sale_service.sales[1].book.author, "Other")
+        self.employee_service.remove_employee("Alice")
+        with self.assertRaises(ValueError):
+            self.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 14.0)
+
     def test_get_sales_by_date(self):
         self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
         self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
@@ -98,6 +283,517 @@ class TestSaleService(unittest.TestCase):
         self.assertEqual(len(sales), 1)
         self.assertEqual(sales[0].sale_date, "2024-08-30")
 
+    def test_get_sales_by_period_out_of_order(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-09-02", 11.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 12.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-09-01", 13.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        sales = self.sale_service.get_sales_by_period("2024-08-30", "2024-09-01")
+        self.assertEqual([s.actual_sale_price for s in sales], [12.0, 14.0, 13.0])
+        self.assertEqual(len(self.sale_service.get_sales_by_date("2024-08-30")), 2)
+        self.assertEqual(self.sale_service.get_sales_by_period("2024-09-03", "2024-09-01"), [])
+
+    def test_add_sale_invalid_date(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        with self.assertRaises(ValueError):
+            self.sale_service.add_sale("Alice", "Test Book", "30.08.2024", 14.0)
+        self.assertEqual(self.sale_service.sales, [])
+
+
+class TestPaginatedReads(unittest.TestCase):
+    def fill(self, employee_service, book_service, sale_service):
+        employee_service.add_employees([
+            {"name": name, "position": position, "phone": "000", "email": f"{name}@example.com"}
+            for name, position in (("Alice", "Manager"), ("Bob", "Sales"), ("Carol", "Sales"))])
+        book_service.add_books([{"title": f"Book {i}", "year": 2000 + i, "author": "Author",
+                                 "genre": "Odd" if i % 2 else "Even", "cost": 1.0, "sale_price": 2.0} for i in range(5)])
+        sale_service.add_sales([{"employee_name": ("Alice", "Bob", "Carol")[i % 3], "book_title": f"Book {i % 5}",
+                                 "sale_date": f"2024-09-{10 - i // 2:02d}", "actual_sale_price": float(i)}
+                                for i in range(12)])
+
+    def open_memory(self):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        self.fill(employee_service, book_service, sale_service)
+        return employee_service, book_service, sale_service
+
+    def open_sqlite(self):
+        storage = SQLiteStorage()
+        self.addCleanup(storage.close)
+        employee_service = SQLiteEmployeeService(storage)
+        book_service = SQLiteBookService(storage)
+        sale_service = SQLiteSaleService(storage, employee_service, book_service)
+        self.fill(employee_service, book_service, sale_service)
+        return employee_service, book_service, sale_service
+
+    def test_snapshot_views(self):
+        employee_service, book_service, _ = self.open_memory()
+        employees = employee_service.get_all_employees()
+        books = book_service.get_all_books()
+        employee_service.remove_employee("Alice")
+        employee_service.add_employee("Dave", "Sales", "111", "dave@example.com")
+        book_service.remove_book("Book 0")
+        self.assertEqual([employee.name for employee in employees], ["Alice", "Bob", "Carol"])
+        self.assertEqual(employees[-1].name, "Carol")
+        self.assertEqual([employee.name for employee in employees[1:]], ["Bob", "Carol"])
+        self.assertEqual(len(employees[5:]), 0)
+        self.assertEqual([book.title for book in books[::2]], ["Book 0", "Book 2", "Book 4"])
+        with self.assertRaises(IndexError):
+            employees[3]
+        self.assertEqual([employee.name for employee in employee_service.get_all_employees()], ["Bob", "Carol", "Dave"])
+        self.assertEqual(len(book_service.get_all_books()), 4)
+
+    def test_paginated_reads_match_across_backends(self):
+        for employee_service, book_service, sale_service in (self.open_memory(), self.open_sqlite()):
+            self.assertEqual([e.name for e in employee_service.iter_employees("Sales", offset=1)], ["Carol"])
+            self.assertEqual([e.name for e in employee_service.iter_employees(offset=1, limit=1)], ["Bob"])
+            self.assertEqual([b.title for b in book_service.iter_books(genre="Even", offset=1, limit=5)],
+                             ["Book 2", "Book 4"])
+            self.assertEqual([b.title for b in book_service.iter_books(limit=2)], ["Book 0", "Book 1"])
+
+            pages = []
+            cursor = None
+            while True:
+                page, cursor = sale_service.get_sales_page("2024-09-06", "2024-09-09", limit=3, after=cursor)
+                pages.append([(sale.sale_date, sale.actual_sale_price) for sale in page])
+                if cursor is None:
+                    break
+            self.assertEqual(pages, [[("2024-09-06", 8.0), ("2024-09-06", 9.0), ("2024-09-07", 6.0)],
+                                     [("2024-09-07", 7.0), ("2024-09-08", 4.0), ("2024-09-08", 5.0)],
+                                     [("2024-09-09", 2.0), ("2024-09-09", 3.0)]])
+
+            page, cursor = sale_service.get_sales_page(employee_name="Bob", limit=2)
+            self.assertEqual([sale.actual_sale_price for sale in page], [10.0, 7.0])
+            sale_service.add_sale("Bob", "Book 1", "2024-09-07", 20.0)
+            page, cursor = sale_service.get_sales_page(employee_name="Bob", limit=2, after=cursor)
+            self.assertEqual([sale.actual_sale_price for sale in page], [20.0, 4.0])
+            page, cursor = sale_service.get_sales_page(employee_name="Bob", book_title="Book 1", after=cursor)
+            self.assertEqual(([sale.actual_sale_price for sale in page], cursor), ([1.0], None))
+
+    def test_report_pages(self):
+        employee_service, book_service, sale_service = self.open_memory()
+        report = Report(employee_service, book_service, sale_service)
+        text, cursor = report.generate_sales_report_page("2024-09-10", limit=1)
+        self.assertEqual(text, "2024-09-10: Alice sold 'Book 0' for 0.0")
+        text, cursor = report.generate_sales_report_page("2024-09-10", after=cursor)
+        self.assertEqual((text, cursor), ("2024-09-10: Bob sold 'Book 1' for 1.0", None))
+
+
+class TestBulkIngestion(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.employee_service.add_employees([
+            {"name": "Alice", "position": "Manager", "phone": "444-444", "email": "alice@example.com"},
+            {"name": "Bob", "position": "Sales", "phone": "555-555", "email": "bob@example.com"}
+        ])
+        self.book_service.add_books([
+            {"title": "Test Book", "year": 2024, "author": "Author", "genre": "Genre", "cost": 10.0, "sale_price": 15.0},
+            {"title": "Test Book", "year": 2020, "author": "Other", "genre": "Genre", "cost": 5.0, "sale_price": 7.5}
+        ])
+
+    def test_add_many(self):
+        self.assertEqual([e.name for e in self.employee_service.get_all_employees()], ["Alice", "Bob"])
+        self.assertEqual(self.book_service.find_book("Test Book").author, "Author")
+        self.assertIsNotNone(self.book_service.find_book("Test Book", "Other"))
+
+    def test_batches_are_all_or_nothing(self):
+        with self.assertRaises(ValueError):
+            self.employee_service.add_employees([
+                {"name": "Carol", "position": "Sales", "phone": "666-666", "email": "carol@example.com"},
+                {"name": "Dave", "position": "Sales", "phone": "777-777", "email": "carol@example.com"}
+            ])
+        with self.assertRaises(ValueError):
+            self.employee_service.add_employees([
+                {"name": "Alice", "position": "Sales", "phone": "666-666", "email": "new@example.com"}
+            ])
+        with self.assertRaises(ValueError):
+            self.book_service.add_books([
+                {"title": "New", "year": 2024, "author": "A", "genre": "G", "cost": 1.0, "sale_price": 2.0},
+                {"title": "New", "year": 2024, "author": "A", "genre": "G", "cost": 1.0, "sale_price": 2.0}
+            ])
+        with self.assertRaises(ValueError):
+            self.sale_service.add_sales([
+                {"employee_name": "Alice", "book_title": "Test Book", "sale_date": "2024-08-30", "actual_sale_price": 14.0},
+                {"employee_name": "Carol", "book_title": "Test Book", "sale_date": "2024-08-30", "actual_sale_price": 14.0}
+            ])
+        self.assertEqual(len(self.employee_service.get_all_employees()), 2)
+        self.assertIsNone(self.employee_service.find_employee("Carol"))
+        self.assertIsNone(self.book_service.find_book("New"))
+        self.assertEqual(len(self.sale_service.sales), 0)
+        self.assertEqual(self.sale_service.totals.count, 0)
+
+    def test_add_sales_merges_date_index(self):
+        self.sale_service.add_sale("Alice", "Test Book", "2024-09-15", 1.0)
+        records = [{"employee_name": "Bob", "book_title": "Test Book",
+                    "sale_date": date.fromordinal(date_to_ordinal("2024-09-30") - i).isoformat(),
+                    "actual_sale_price": float(i)} for i in range(100)]
+        self.sale_service.add_sales(records)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-09-15", 2.0)
+        self.assertFalse(self.sale_service.index_sorted)
+        dates = [s.sale_date for s in self.sale_service.get_sales_by_period("2024-01-01", "2024-12-31")]
+        self.assertEqual(dates, sorted(dates))
+        self.assertTrue(self.sale_service.index_sorted)
+        on_day = self.sale_service.get_sales_by_date("2024-09-15")
+        self.assertEqual([(s.employee.name, s.actual_sale_price) for s in on_day],
+                         [("Alice", 1.0), ("Bob", 15.0), ("Alice", 2.0)])
+        self.assertEqual(self.sale_service.totals.count, 102)
+
+
+class TestColumnarSales(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service, columnar=True)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.employee_service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.book_service.add_book("Other Book", 2020, "Author", "Genre", 5.0, 7.5)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 14.0)
+        self.sale_service.add_sale("Bob", "Other Book", "2024-08-30", 7.0)
+        self.sale_service.add_sale("Alice", "Other Book", "2024-09-01", 7.5)
+
+    def test_views_expose_sale_interface(self):
+        sales = self.sale_service.sales
+        self.assertEqual(len(sales), 3)
+        self.assertEqual(sales[0].employee.name, "Alice")
+        self.assertEqual(sales[-1].book.title, "Other Book")
+        self.assertEqual(sales[1].sale_date, "2024-08-30")
+        self.assertEqual(sales[1].actual_sale_price, 7.0)
+        self.assertEqual(str(sales[0]),
+                         "Sale(Employee: Alice, Book: Test Book, Date: 2024-08-31, Actual Sale Price: 14.0)")
+        self.assertEqual(sales[2].to_dict(), {"employee_name": "Alice", "book_title": "Other Book",
+                                              "sale_date": "2024-09-01", "actual_sale_price": 7.5})
+        self.assertEqual(sales[0], sales[0])
+        self.assertEqual([s.actual_sale_price for s in sales], [14.0, 7.0, 7.5])
+        with self.assertRaises(IndexError):
+            sales[3]
+
+    def test_get_sales_by_period(self):
+        sales = self.sale_service.get_sales_by_period("2024-08-30", "2024-08-31")
+        self.assertEqual([s.sale_date for s in sales], ["2024-08-30", "2024-08-31"])
+
+    def test_slotted_records(self):
+        self.assertFalse(hasattr(self.employee_service.find_employee("Alice"), "__dict__"))
+        self.assertFalse(hasattr(self.book_service.find_book("Test Book"), "__dict__"))
+        self.assertFalse(hasattr(self.sale_service.sales[0], "__dict__"))
+
+
+class TestDataManager(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.data_manager = DataManager(self.employee_service, self.book_service, self.sale_service)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 13.5)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def paths(self, extension):
+        return [os.path.join(self.temp_dir.name, name + extension) for name in ("employees", "books", "sales")]
+
+    def reload(self, paths, **kwargs):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        DataManager(employee_service, book_service, sale_service).load_data(*paths, **kwargs)
+        return employee_service, book_service, sale_service
+
+    def assert_same_data(self, employee_service, book_service, sale_service):
+        self.assertEqual([e.to_dict() for e in employee_service.get_all_employees()],
+                         [e.to_dict() for e in self.employee_service.get_all_employees()])
+        self.assertEqual([b.to_dict() for b in book_service.get_all_books()],
+                         [b.to_dict() for b in self.book_service.get_all_books()])
+        self.assertEqual([s.to_dict() for s in sale_service.sales],
+                         [s.to_dict() for s in self.sale_service.sales])
+
+    def test_save_and_load_json(self):
+        paths = self.paths(".json")
+        self.data_manager.save_data(*paths)
+        with open(paths[2]) as f:
+            self.assertEqual(len(json.load(f)), 2)
+        self.assert_same_data(*self.reload(paths, batch_size=1))
+
+    def test_save_and_load_json_lines(self):
+        paths = self.paths(".jsonl")
+        self.data_manager.save_data(*paths)
+        with open(paths[2]) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assert_same_data(*self.reload(paths))
+
+    def test_iter_json_records_small_chunks(self):
+        records = [{"a": i, "text": "x" * i} for i in range(20)]
+        parsed = list(iter_json_records(io.StringIO(json.dumps(records)), chunk_size=7))
+        self.assertEqual(parsed, records)
+        lines = "\n".join(json.dumps(r) for r in records)
+        parsed = list(iter_json_records(io.StringIO(lines), chunk_size=7))
+        self.assertEqual(parsed, records)
+        self.assertEqual(list(iter_json_records(io.StringIO("  [ ]"))), [])
+        with self.assertRaises(ValueError):
+            list(iter_json_records(io.StringIO('[{"a": 1}, {"b"'), chunk_size=4))
+
+    def test_iter_json_records_line_separators(self):
+        records = [{"title": "A\u2028B\u2029C\x85D\x1cE"}, {"title": "F"}]
+        lines = "\n".join(json.dumps(r, ensure_ascii=False) for r in records)
+        parsed = list(iter_json_records(io.StringIO(" " * 20 + lines), chunk_size=7))
+        self.assertEqual(parsed, records)
+        parsed = list(iter_json_records(io.StringIO(" " * 20 + json.dumps(records)), chunk_size=7))
+        self.assertEqual(parsed, records)
+        self.assertEqual(list(iter_json_records(io.StringIO(" " * 20), chunk_size=7)), [])
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.employee_service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.book_service.add_book("Другая книга", 2020, "Автор", "Genre", 5.0, 7.5)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 14.0)
+        self.sale_service.add_sale("Bob", "Другая книга", "2024-08-30", 7.0)
+        self.sale_service.add_sale("Alice", "Другая книга", "2024-09-01", 7.5)
+        self.employee_service.remove_employee("Bob")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "bookstore.snap")
+        DataManager(self.employee_service, self.book_service, self.sale_service).save_binary(self.path)
+
+    def load(self, sale_service=None):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = sale_service or SaleService(employee_service, book_service)
+        sale_service.employee_service = employee_service
+        sale_service.book_service = book_service
+        DataManager(employee_service, book_service, sale_service).load_binary(self.path)
+        return employee_service, book_service, sale_service
+
+    def test_queries_answered_from_mapping(self):
+        employee_service, book_service, sale_service = self.load()
+        self.assertTrue(sale_service.sales.mapped)
+        self.assertIsNone(employee_service.find_employee("Bob"))
+        self.assertEqual([e.to_dict() for e in employee_service.get_all_employees()],
+                         [e.to_dict() for e in self.employee_service.get_all_employees()])
+        self.assertEqual([s.to_dict() for s in sale_service.iter_sales()],
+                         [s.to_dict() for s in self.sale_service.iter_sales()])
+        report = Report(employee_service, book_service, sale_service)
+        expected = Report(self.employee_service, self.book_service, self.sale_service)
+        self.assertEqual(report.generate_sales_report("2024-08-30", "2024-08-31"),
+                         expected.generate_sales_report("2024-08-30", "2024-08-31"))
+        for method, args in (("generate_employee_sales_report", ("Bob",)), ("generate_top_books_report", (2,)),
+                             ("generate_revenue_summary", ()), ("generate_rollup_report", ("month", "book"))):
+            self.assertEqual(getattr(report, method)(*args), getattr(expected, method)(*args))
+
+    def test_writes_after_load(self):
+        employee_service, book_service, sale_service = self.load()
+        report = Report(employee_service, book_service, sale_service)
+        self.assertEqual(report.generate_revenue_summary("2024-09-01"),
+                         "Revenue summary from 2024-09-01 to the last sale:\nSales: 1\nRevenue: 7.5")
+        sale_service.add_sale("Alice", "Test Book", "2024-08-29", 15.0)
+        self.assertFalse(sale_service.sales.mapped)
+        self.assertEqual([s.sale_date for s in sale_service.get_sales_by_period("2024-08-29", "2024-08-31")],
+                         ["2024-08-29", "2024-08-30", "2024-08-31"])
+        self.assertEqual(report.generate_employee_sales_report("Alice").count("\n"), 3)
+        self.assertEqual(sale_service.get_rollup("year"), {"2024": [4, 43.5, 13.5]})
+
+        DataManager(employee_service, book_service, sale_service).save_binary(self.path)
+        self.assertEqual(len(self.load()[2].get_sales_by_employee("Alice")), 3)
+
+    def test_load_into_non_empty_service(self):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        employee_service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        book_service.add_book("Test Book", 1999, "Someone", "Genre", 1.0, 2.0)
+        sale_service.add_sale("Bob", "Test Book", "2024-01-01", 2.0)
+        employee_service.remove_employee("Bob")
+        self.load(sale_service)
+        self.assertEqual(sale_service.get_revenue_totals(), (4, 30.5))
+        self.assertEqual(len(sale_service.get_sales_by_employee("Bob")), 2)
+
+    def test_rejects_other_files_and_journals(self):
+        with open(self.path, "wb") as f:
+            f.write(b"[]" + bytes(30))
+        with self.assertRaises(ValueError):
+            self.load()
+        data_manager = DataManager(EmployeeService(), BookService(), self.sale_service,
+                                   journal_file=os.path.join(self.temp_dir.name, "journal.jsonl"))
+        self.addCleanup(data_manager.journal.close)
+        with self.assertRaises(ValueError):
+            data_manager.save_binary(self.path)
+
+    def test_save_rejects_sqlite_sale_service(self):
+        storage = SQLiteStorage()
+        self.addCleanup(storage.close)
+        employee_service = SQLiteEmployeeService(storage)
+        book_service = SQLiteBookService(storage)
+        sale_service = SQLiteSaleService(storage, employee_service, book_service)
+        employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        data_manager = DataManager(employee_service, book_service, sale_service)
+        copy_path = os.path.join(self.temp_dir.name, "copy.snap")
+        with self.assertRaises(ValueError):
+            data_manager.save_binary(copy_path)
+        self.assertFalse(os.path.exists(copy_path))
+
+
+class TestShardedLoading(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.employee_file = os.path.join(self.temp_dir.name, "employees.json")
+        self.book_file = os.path.join(self.temp_dir.name, "books.json")
+        with open(self.employee_file, "w") as f:
+            json.dump([{"name": name, "position": "Sales", "phone": "000", "email": name + "@example.com"}
+                       for name in ("Alice", "Bob")], f)
+        with open(self.book_file, "w") as f:
+            json.dump([{"title": title, "year": 2024, "author": "Author", "genre": "Genre", "cost": 1.0,
+                        "sale_price": 2.0} for title in ("A", "B", "C")], f)
+        for month in (9, 8, 10):
+            with open(os.path.join(self.temp_dir.name, f"sales-2024-{month:02d}.jsonl"), "w") as f:
+                for day in range(1, 29):
+                    f.write(json.dumps({"employee_name": ("Alice", "Bob")[day % 2], "book_title": "ABC"[day % 3],
+                                        "sale_date": f"2024-{month:02d}-{day:02d}", "actual_sale_price": day + 0.5}))
+                    f.write("\n")
+
+    def load(self, workers, columnar=False):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service, columnar=columnar)
+        DataManager(employee_service, book_service, sale_service).load_data(
+            self.employee_file, self.book_file, os.path.join(self.temp_dir.name, "sales-*.jsonl"), workers=workers)
+        return sale_service
+
+    def test_parallel_load_matches_sequential(self):
+        sequential = self.load(1)
+        parallel = self.load(2)
+        self.assertEqual(len(parallel.sales), 84)
+        self.assertEqual([s.to_dict() for s in parallel.sales], [s.to_dict() for s in sequential.sales])
+        self.assertEqual(parallel.sales[0].sale_date, "2024-08-01")
+        self.assertEqual([s.to_dict() for s in parallel.get_sales_by_period("2024-08-15", "2024-09-15")],
+                         [s.to_dict() for s in sequential.get_sales_by_period("2024-08-15", "2024-09-15")])
+        self.assertEqual(parallel.get_top_titles(3), sequential.get_top_titles(3))
+        self.assertEqual([s.to_dict() for s in self.load(2, columnar=True).sales],
+                         [s.to_dict() for s in sequential.sales])
+
+    def test_parallel_load_keeps_integer_prices(self):
+        with open(os.path.join(self.temp_dir.name, "sales-2024-11.jsonl"), "w") as f:
+            for day in range(1, 5):
+                f.write(json.dumps({"employee_name": "Alice", "book_title": "A", "sale_date": f"2024-11-{day:02d}",
+                                    "actual_sale_price": 14}) + "\n")
+        sequential = self.load(1)
+        parallel = self.load(2)
+        self.assertEqual([s.to_dict() for s in parallel.sales], [s.to_dict() for s in sequential.sales])
+        sale = parallel.get_sales_by_date("2024-11-01")[0]
+        self.assertIs(type(sale.actual_sale_price), int)
+        self.assertEqual(str(sale), str(sequential.get_sales_by_date("2024-11-01")[0]))
+
+    def test_unknown_reference_rejects_shard(self):
+        with open(os.path.join(self.temp_dir.name, "sales-2024-11.jsonl"), "w") as f:
+            f.write(json.dumps({"employee_name": "Carol", "book_title": "A", "sale_date": "2024-11-01",
+                                "actual_sale_price": 1.0}) + "\n")
+        with self.assertRaises(ValueError):
+            self.load(2)
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.paths = [os.path.join(self.temp_dir.name, name) for name in ("employees.json", "books.json", "sales.json")]
+        self.journal_file = os.path.join(self.temp_dir.name, "journal.jsonl")
+
+    def open_store(self, compact_threshold=10000):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        data_manager = DataManager(employee_service, book_service, sale_service,
+                                   journal_file=self.journal_file, compact_threshold=compact_threshold)
+        self.addCleanup(data_manager.journal.close)
+        data_manager.load_data(*self.paths)
+        return data_manager
+
+    def fill(self, data_manager):
+        data_manager.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        data_manager.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        data_manager.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        data_manager.book_service.edit_book("Test Book", new_cost=12.0)
+        data_manager.save_data(*self.paths)
+
+    def test_close_unregisters_listeners(self):
+        data_manager = self.open_store()
+        data_manager.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        data_manager.close()
+        data_manager.employee_service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        with open(self.journal_file) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertIsNone(data_manager.journal.file)
+
+    def test_replay_without_snapshot(self):
+        self.fill(self.open_store())
+        self.assertFalse(os.path.exists(self.paths[0]))
+        with open(self.journal_file) as f:
+            self.assertEqual(len(f.readlines()), 4)
+        data_manager = self.open_store()
+        self.assertEqual(data_manager.book_service.find_book("Test Book").cost, 12.0)
+        self.assertEqual(len(data_manager.sale_service.sales), 1)
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        self.fill(self.open_store(compact_threshold=3))
+        self.assertEqual(os.path.getsize(self.journal_file), 0)
+        data_manager = self.open_store(compact_threshold=3)
+        data_manager.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 13.0)
+        data_manager.save_data(*self.paths)
+        data_manager = self.open_store()
+        self.assertEqual([s.actual_sale_price for s in data_manager.sale_service.sales], [14.0, 13.0])
+
+    def test_replay_batches(self):
+        data_manager = self.open_store()
+        data_manager.employee_service.add_employees([
+            {"name": "Alice", "position": "Manager", "phone": "444-444", "email": "alice@example.com"}])
+        data_manager.book_service.add_books([
+            {"title": "Test Book", "year": 2024, "author": "Author", "genre": "Genre", "cost": 10.0, "sale_price": 15.0}])
+        data_manager.sale_service.add_sales([
+            {"employee_name": "Alice", "book_title": "Test Book", "sale_date": "2024-08-30", "actual_sale_price": 14.0},
+            {"employee_name": "Alice", "book_title": "Test Book", "sale_date": "2024-08-31", "actual_sale_price": 13.0}])
+        data_manager.save_data(*self.paths)
+        with open(self.journal_file) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(len(self.open_store().sale_service.sales), 2)
+
+    def test_torn_record_is_discarded(self):
+        self.fill(self.open_store())
+        with open(self.journal_file, "a") as f:
+            f.write('{"seq": 5, "op": "add_sa')
+        data_manager = self.open_store()
+        self.assertEqual(len(data_manager.sale_service.sales), 1)
+        data_manager.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 13.0)
+        data_manager.save_data(*self.paths)
+        self.assertEqual(len(self.open_store().sale_service.sales), 2)
+
+    def test_crash_during_compaction(self):
+        data_manager = self.open_store()
+        self.fill(data_manager)
+        data_manager.journal.sync()
+        pending = [(write_temp_file(path, write), path)
+                   for path, write in data_manager.snapshot_writers(*self.paths)]
+        data_manager.journal.write_checkpoint(data_manager.journal.seq, pending)
+        os.replace(*pending[0])
+        data_manager = self.open_store()
+        self.assertTrue(os.path.exists(self.paths[2]))
+        self.assertEqual(len(data_manager.sale_service.sales), 1)
+        self.assertEqual(data_manager.book_service.find_book("Test Book").cost, 12.0)
+
 
 class TestReport(unittest.TestCase):
     def setUp(self):
@@ -130,5 +826,592 @@ class TestReport(unittest.TestCase):
         self.assertEqual(self.report.generate_top_books_report(1), expected_report)
 
 
+class TestAggregation(unittest.TestCase):
+    BOOKS = [{"title": f"Book {i}", "year": 2000 + i, "author": "Author", "genre": ("Novel", "Poetry", "Crime")[i % 3],
+              "cost": 2.0 + i, "sale_price": 10.0 + i} for i in range(6)]
+    SALES = [{"employee_name": ("Alice", "Bob", "Carol")[i % 3], "book_title": f"Book {(i * i) % 7 % 6}",
+              "sale_date": f"2024-08-{1 + (i * 5) % 20:02d}", "actual_sale_price": 8.0 + (i % 4) * 0.5}
+             for i in range(120)]
+
+    def fill(self, employee_service, book_service, sale_service):
+        employee_service.add_employees([{"name": name, "position": "Sales", "phone": name,
+                                         "email": name + "@example.com"} for name in ("Alice", "Bob", "Carol")])
+        book_service.add_books(self.BOOKS)
+        for record in self.SALES[:40]:
+            sale_service.add_sale(**record)
+        sale_service.add_sales(self.SALES[40:])
+        book_service.edit_book("Book 2", new_cost=3.5, new_genre="Novel")
+
+    def expected_groups(self, key):
+        books = {book["title"]: dict(book) for book in self.BOOKS}
+        books["Book 2"].update(cost=3.5, genre="Novel")
+        groups = {}
+        for sale in self.SALES:
+            book = books[sale["book_title"]]
+            entry = groups.setdefault(key(sale, book), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += sale["actual_sale_price"]
+            entry[2] += sale["actual_sale_price"] - book["cost"]
+        return groups
+
+    def check_aggregation(self, sale_service):
+        counts = {}
+        for sale in self.SALES:
+            counts[sale["book_title"]] = counts.get(sale["book_title"], 0) + 1
+        ranked = sorted(counts.items(), key=lambda item: -item[1])
+        self.assertEqual(sale_service.get_top_titles(4), ranked[:4])
+        self.assertEqual(sale_service.get_top_titles(0), [])
+
+        by_day_and_genre = {}
+        for (day, genre), entry in self.expected_groups(lambda sale, book: (sale["sale_date"], book["genre"])).items():
+            by_day_and_genre.setdefault(day, {})[genre] = entry
+        rollup = sale_service.get_rollup("day", "genre")
+        self.assertEqual(list(rollup), sorted(by_day_and_genre))
+        self.assertEqual(rollup, by_day_and_genre)
+        self.assertEqual(sale_service.get_rollup("year", "book"),
+                         {"2024": self.expected_groups(lambda sale, book: book["title"])})
+        revenue = sum(sale["actual_sale_price"] for sale in self.SALES)
+        self.assertEqual(sale_service.get_rollup("year"), {"2024": [120, revenue, sale_service.get_total_margin()]})
+
+    def test_in_memory_and_sqlite(self):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        self.fill(employee_service, book_service, sale_service)
+        self.check_aggregation(sale_service)
+
+        storage = SQLiteStorage()
+        self.addCleanup(storage.close)
+        employee_service = SQLiteEmployeeService(storage)
+        book_service = SQLiteBookService(storage)
+        sale_service = SQLiteSaleService(storage, employee_service, book_service)
+        self.fill(employee_service, book_service, sale_service)
+        self.check_aggregation(sale_service)
+
+
+class TestStreamingReports(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.report = Report(self.employee_service, self.book_service, self.sale_service)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test, Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.sale_service.add_sale("Alice", "Test, Book", "2024-08-31", 13.0)
+        self.sale_service.add_sale("Alice", "Test, Book", "2024-08-30", 14.0)
+        self.sale_service.add_sale("Alice", "Test, Book", "2024-09-01", 12.0)
+
+    def test_iter_matches_generate(self):
+        lines = self.report.iter_sales_report("2024-08-30", "2024-08-31")
+        self.assertEqual(next(lines), "2024-08-30: Alice sold 'Test, Book' for 14.0")
+        self.assertEqual("\n".join(["2024-08-30: Alice sold 'Test, Book' for 14.0"] + list(lines)),
+                         self.report.generate_sales_report("2024-08-30", "2024-08-31"))
+
+    def test_write_formats(self):
+        out = io.StringIO()
+        self.assertEqual(self.report.write_sales_report(out, "2024-08-01", "2024-08-31", chunk_size=1), 2)
+        self.assertEqual(out.getvalue(), self.report.generate_sales_report("2024-08-01", "2024-08-31") + "\n")
+
+        out = io.StringIO()
+        self.report.write_sales_report(out, "2024-08-01", "2024-09-30", "jsonl", chunk_size=2)
+        self.assertEqual([json.loads(line)["actual_sale_price"] for line in out.getvalue().splitlines()],
+                         [14.0, 13.0, 12.0])
+
+        out = io.StringIO()
+        self.report.write_sales_report(out, "2024-09-01", "2024-09-30", "csv")
+        self.assertEqual(out.getvalue().splitlines(),
+                         ["sale_date,employee_name,book_title,actual_sale_price",
+                          '2024-09-01,Alice,"Test, Book",12.0'])
+        with self.assertRaises(ValueError):
+            self.report.write_sales_report(out, "2024-09-01", "2024-09-30", "xml")
+
+
+class TestSalesTotals(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.report = Report(self.employee_service, self.book_service, self.sale_service)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.book_service.add_book("Other Book", 2020, "Author", "Genre", 5.0, 7.5)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        self.sale_service.add_sale("Alice", "Other Book", "2024-08-31", 7.0)
+        self.sale_service.add_sale("Alice", "Other Book", "2024-09-01", 7.5)
+
+    def test_running_totals(self):
+        totals = self.sale_service.totals
+        self.assertEqual(totals.count, 3)
+        self.assertEqual(totals.revenue, 28.5)
+        self.assertEqual(totals.by_title(), {"Test Book": [1, 14.0], "Other Book": [2, 14.5]})
+        self.assertEqual(totals.by_day[date_to_ordinal("2024-08-31")], [1, 7.0])
+
+    def test_revenue_summary(self):
+        self.assertEqual(self.report.generate_revenue_summary(), "Revenue summary:\nSales: 3\nRevenue: 28.5\nMargin: 8.5")
+        self.assertEqual(self.report.generate_revenue_summary("2024-08-31", "2024-09-01"),
+                         "Revenue summary from 2024-08-31 to 2024-09-01:\nSales: 2\nRevenue: 14.5")
+        self.assertEqual(self.report.generate_revenue_summary(end_date="2024-08-30"),
+                         "Revenue summary from the first sale to 2024-08-30:\nSales: 1\nRevenue: 14.0")
+
+    def test_edit_corrects_margin(self):
+        self.book_service.edit_book("Other Book", new_cost=6.0)
+        self.assertTrue(self.report.generate_revenue_summary().endswith("Margin: 6.5"))
+
+    def test_employee_rows_survive_remove_and_readd(self):
+        self.employee_service.remove_employee("Alice")
+        self.employee_service.add_employee("Alice", "Sales", "555-555", "alice@example.com")
+        self.sale_service.add_sale("Alice", "Test Book", "2024-09-02", 15.0)
+        report = self.report.generate_employee_sales_report("Alice")
+        self.assertEqual(report.count("\n"), 4)
+        self.assertTrue(report.endswith("2024-09-02: 'Test Book' sold for 15.0"))
+        self.assertEqual(self.report.generate_top_books_report(1), "Top 1 selling books:\nTest Book: 2 sales")
+
+
+class TestSalesRollups(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.employee_service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Novel", 10.0, 15.0)
+        self.book_service.add_book("Other Book", 2020, "Author", "Poetry", 5.0, 7.5)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        self.sale_service.add_sales([
+            {"employee_name": "Bob", "book_title": "Other Book", "sale_date": "2024-08-31", "actual_sale_price": 7.0},
+            {"employee_name": "Alice", "book_title": "Other Book", "sale_date": "2024-09-02", "actual_sale_price": 7.5},
+            {"employee_name": "Bob", "book_title": "Test Book", "sale_date": "2024-08-26", "actual_sale_price": 15.0}
+        ])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_periods_and_dimensions(self):
+        rollups = self.sale_service.rollups
+        self.assertEqual(rollups.query(), {"2024-08-26": [1, 15.0, 5.0], "2024-08-30": [1, 14.0, 4.0],
+                                           "2024-08-31": [1, 7.0, 2.0], "2024-09-02": [1, 7.5, 2.5]})
+        self.assertEqual(rollups.query("week"), {"2024-W35": [3, 36.0, 11.0], "2024-W36": [1, 7.5, 2.5]})
+        self.assertEqual(rollups.query("month", "employee"),
+                         {"2024-08": {"Bob": [2, 22.0, 7.0], "Alice": [1, 14.0, 4.0]},
+                          "2024-09": {"Alice": [1, 7.5, 2.5]}})
+        self.assertEqual(rollups.query("year", "genre", "2024-08-30", "2024-09-01"),
+                         {"2024": {"Novel": [1, 14.0, 4.0], "Poetry": [1, 7.0, 2.0]}})
+        with self.assertRaises(ValueError):
+            rollups.query("quarter")
+        with self.assertRaises(ValueError):
+            rollups.query("day", "position")
+
+    def test_matches_rebuild_and_sqlite(self):
+        expected = self.sale_service.get_rollup("week", "book")
+        self.sale_service.rebuild_rollups()
+        self.assertEqual(self.sale_service.get_rollup("week", "book"), expected)
+
+        storage = SQLiteStorage()
+        self.addCleanup(storage.close)
+        employee_service = SQLiteEmployeeService(storage)
+        book_service = SQLiteBookService(storage)
+        sale_service = SQLiteSaleService(storage, employee_service, book_service)
+        employee_service.add_employees([e.to_dict() for e in self.employee_service.get_all_employees()])
+        book_service.add_books([b.to_dict() for b in self.book_service.get_all_books()])
+        sale_service.add_sales([s.to_dict() for s in self.sale_service.sales])
+        self.assertEqual(sale_service.get_rollup("week", "book"), expected)
+        self.assertEqual(sale_service.get_rollup("month", start_date="2024-09-01"), {"2024-09": [1, 7.5, 2.5]})
+
+    def test_uses_current_cost_and_genre(self):
+        self.book_service.edit_book("Other Book", new_cost=6.0, new_genre="Novel")
+        self.assertEqual(self.sale_service.get_rollup("year"),
+                         {"2024": [4, 43.5, self.sale_service.get_total_margin()]})
+        self.assertEqual(self.sale_service.get_rollup("month", "genre"),
+                         {"2024-08": {"Novel": [3, 36.0, 10.0]}, "2024-09": {"Novel": [1, 7.5, 1.5]}})
+        expected = self.sale_service.get_rollup("week", "genre")
+        self.sale_service.rebuild_rollups()
+        self.assertEqual(self.sale_service.get_rollup("week", "genre"), expected)
+
+    def test_persisted_with_snapshot(self):
+        paths = [os.path.join(self.temp_dir.name, name) for name in ("employees.json", "books.json", "sales.json")]
+        rollup_file = os.path.join(self.temp_dir.name, "rollups.json")
+        DataManager(self.employee_service, self.book_service, self.sale_service,
+                    rollup_file=rollup_file).save_data(*paths)
+        with open(rollup_file) as f:
+            self.assertEqual(json.load(f)["sales"], 4)
+
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        sale_service.rebuild_rollups = None
+        DataManager(employee_service, book_service, sale_service, rollup_file=rollup_file).load_data(*paths)
+        self.assertEqual(sale_service.get_rollup("month", "genre"), self.sale_service.get_rollup("month", "genre"))
+        sale_service.add_sale("Alice", "Test Book", "2024-09-03", 15.0)
+        self.assertEqual(sale_service.get_rollup("month")["2024-09"], [2, 22.5, 7.5])
+        book_service.edit_book("Test Book", new_cost=12.0)
+        self.assertEqual(sum(entry[2] for entry in sale_service.get_rollup("year").values()),
+                         sale_service.get_total_margin())
+
+    def test_stale_rollups_are_rebuilt(self):
+        paths = [os.path.join(self.temp_dir.name, name) for name in ("employees.json", "books.json", "sales.json")]
+        rollup_file = os.path.join(self.temp_dir.name, "rollups.json")
+        DataManager(self.employee_service, self.book_service, self.sale_service).save_data(*paths)
+        with open(rollup_file, "w") as f:
+            json.dump({"sales": 1, "days": {}}, f)
+        employee_service = EmployeeService()
+        book_service = BookService()
+        sale_service = SaleService(employee_service, book_service)
+        DataManager(employee_service, book_service, sale_service, rollup_file=rollup_file).load_data(*paths)
+        self.assertEqual(sale_service.get_rollup("month"), self.sale_service.get_rollup("month"))
+
+    def test_rollup_report_is_invalidated_by_new_sales(self):
+        report = Report(self.employee_service, self.book_service, self.sale_service)
+        self.assertEqual(report.generate_rollup_report("month", "genre", "2024-09-01"),
+                         "Sales by month and genre:\n2024-09 Poetry: 1 sold, revenue 7.5, margin 2.5")
+        self.sale_service.add_sale("Bob", "Test Book", "2024-09-05", 15.0)
+        self.assertEqual(report.generate_rollup_report("month", "genre", "2024-09-01"),
+                         "Sales by month and genre:\n2024-09 Novel: 1 sold, revenue 15.0, margin 5.0\n"
+                         "2024-09 Poetry: 1 sold, revenue 7.5, margin 2.5")
+        self.assertEqual(report.generate_rollup_report("year"), "Sales by year:\n2024: 5 sold, revenue 58.5, margin 18.5")
+
+    def test_rollup_report_is_invalidated_by_book_edits(self):
+        report = Report(self.employee_service, self.book_service, self.sale_service)
+        self.assertEqual(report.generate_rollup_report("month", "genre", "2024-09-01"),
+                         "Sales by month and genre:\n2024-09 Poetry: 1 sold, revenue 7.5, margin 2.5")
+        self.assertEqual(report.generate_rollup_report("year"), "Sales by year:\n2024: 4 sold, revenue 43.5, margin 13.5")
+        self.book_service.edit_book("Other Book", new_cost=6.0, new_genre="Novel")
+        self.assertEqual(report.generate_rollup_report("month", "genre", "2024-09-01"),
+                         "Sales by month and genre:\n2024-09 Novel: 1 sold, revenue 7.5, margin 1.5")
+        self.assertEqual(report.generate_rollup_report("year"), "Sales by year:\n2024: 4 sold, revenue 43.5, margin 11.5")
+
+
+class TestReportCache(unittest.TestCase):
+    def setUp(self):
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+        self.report = Report(self.employee_service, self.book_service, self.sale_service, cache_entries=4)
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.employee_service.add_employee("Bob", "Sales", "555-555", "bob@example.com")
+        self.book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        self.book_service.add_book("Other Book", 2020, "Author", "Genre", 5.0, 7.5)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        self.sale_service.add_sale("Bob", "Other Book", "2024-08-31", 7.0)
+
+    def cached_keys(self):
+        return set(self.report.cache.entries)
+
+    def test_hits_and_misses(self):
+        first = self.report.generate_sales_report("2024-08-30", "2024-08-30")
+        self.assertEqual(self.report.generate_sales_report("2024-08-30", "2024-08-30"), first)
+        stats = self.report.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_close_unregisters_listeners(self):
+        self.report.generate_sales_report("2024-08-30", "2024-08-30")
+        self.report.close()
+        for service in (self.employee_service, self.book_service, self.sale_service):
+            self.assertNotIn(self.report.invalidate, service.listeners)
+        self.assertEqual(self.report.cache.stats()["entries"], 0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 15.0)
+
+    def test_new_sale_evicts_only_covering_reports(self):
+        self.report.generate_sales_report("2024-08-30", "2024-08-30")
+        self.report.generate_sales_report("2024-08-31", "2024-09-30")
+        self.report.generate_employee_sales_report("Alice")
+        self.report.generate_employee_sales_report("Bob")
+        self.sale_service.add_sale("Bob", "Test Book", "2024-09-02", 15.0)
+        self.assertEqual(self.cached_keys(), {("sales", "2024-08-30", "2024-08-30"), ("employee_sales", "Alice")})
+        self.assertIn("2024-09-02", self.report.generate_sales_report("2024-08-31", "2024-09-30"))
+
+    def test_edit_evicts_reports_that_mention_it(self):
+        self.report.generate_sales_report("2024-08-30", "2024-08-30")
+        self.report.generate_top_books_report(1)
+        self.report.generate_revenue_summary()
+        self.report.generate_revenue_summary("2024-08-30", "2024-08-31")
+        self.book_service.edit_book("Other Book", new_cost=6.0)
+        self.assertEqual(self.cached_keys(), {("sales", "2024-08-30", "2024-08-30"), ("top_books", 1),
+                                              ("revenue_summary", "2024-08-30", "2024-08-31")})
+        self.employee_service.edit_employee("Alice", new_phone="999-999")
+        self.assertEqual(self.cached_keys(), {("top_books", 1), ("revenue_summary", "2024-08-30", "2024-08-31")})
+
+    def test_lru_limits(self):
+        for day in ("2024-08-26", "2024-08-27", "2024-08-28", "2024-08-29"):
+            self.report.generate_sales_report(day, day)
+        self.report.generate_sales_report("2024-08-26", "2024-08-26")
+        self.report.generate_sales_report("2024-08-30", "2024-08-30")
+        self.assertNotIn(("sales", "2024-08-27", "2024-08-27"), self.cached_keys())
+        self.assertIn(("sales", "2024-08-26", "2024-08-26"), self.cached_keys())
+        self.assertEqual(self.report.cache.stats()["evictions"], 1)
+        self.report.cache.max_size = 10
+        self.report.generate_employee_sales_report("Alice")
+        self.assertNotIn(("employee_sales", "Alice"), self.cached_keys())
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "bookstore.db")
+
+    def open_sqlite(self):
+        storage = SQLiteStorage(self.db_path)
+        self.addCleanup(storage.close)
+        employee_service = SQLiteEmployeeService(storage)
+        book_service = SQLiteBookService(storage)
+        sale_service = SQLiteSaleService(storage, employee_service, book_service)
+        return employee_service, book_service, sale_service
+
+    def open_memory(self):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        return employee_service, book_service, SaleService(employee_service, book_service)
+
+    def fill(self, employee_service, book_service, sale_service):
+        employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        employee_service.add_employees([{"name": "Bob", "position": "Sales", "phone": "555-555",
+                                         "email": "bob@example.com"}])
+        book_service.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+        book_service.add_books([{"title": "Other Book", "year": 2020, "author": "Author", "genre": "Genre",
+                                 "cost": 5.0, "sale_price": 7.5}])
+        sale_service.add_sale("Alice", "Test Book", "2024-08-31", 14.0)
+        sale_service.add_sales([
+            {"employee_name": "Bob", "book_title": "Other Book", "sale_date": "2024-08-30", "actual_sale_price": 7.0},
+            {"employee_name": "Bob", "book_title": "Test Book", "sale_date": "2024-09-01", "actual_sale_price": 15.0}
+        ])
+        book_service.edit_book("Other Book", new_cost=6.0)
+        employee_service.edit_employee("Alice", new_email="alice@new.com")
+
+    def reports(self, services):
+        report = Report(*services)
+        return [report.generate_sales_report("2024-08-30", "2024-08-31"),
+                report.generate_employee_sales_report("Bob"),
+                report.generate_top_books_report(2),
+                report.generate_revenue_summary(),
+                report.generate_revenue_summary("2024-08-31")]
+
+    def test_matches_memory_backend(self):
+        sqlite_services = self.open_sqlite()
+        memory_services = self.open_memory()
+        self.fill(*sqlite_services)
+        self.fill(*memory_services)
+        self.assertEqual(self.reports(sqlite_services), self.reports(memory_services))
+        self.assertEqual([e.to_dict() for e in sqlite_services[0].get_all_employees()],
+                         [e.to_dict() for e in memory_services[0].get_all_employees()])
+
+    def test_persists_and_enforces_uniqueness(self):
+        self.fill(*self.open_sqlite())
+        employee_service, book_service, sale_service = self.open_sqlite()
+        self.assertEqual(employee_service.find_employee("Alice").email, "alice@new.com")
+        self.assertEqual(len(sale_service.get_sales_by_period("2024-08-01", "2024-09-30")), 3)
+        with self.assertRaises(ValueError):
+            employee_service.add_employee("Carol", "Sales", "666-666", "bob@example.com")
+        with self.assertRaises(ValueError):
+            book_service.add_books([{"title": "New", "year": 1, "author": "A", "genre": "G", "cost": 1.0,
+                                     "sale_price": 2.0}] * 2)
+        self.assertIsNone(book_service.find_book("New"))
+        with self.assertRaises(ValueError):
+            sale_service.add_sales([
+                {"employee_name": "Bob", "book_title": "Test Book", "sale_date": "2024-09-02", "actual_sale_price": 1.0},
+                {"employee_name": "Carol", "book_title": "Test Book", "sale_date": "2024-09-02", "actual_sale_price": 1.0}
+            ])
+        self.assertEqual(sale_service.get_sales_by_date("2024-09-02"), [])
+
+    def test_removed_records_keep_their_sales(self):
+        employee_service, book_service, sale_service = self.open_sqlite()
+        self.fill(employee_service, book_service, sale_service)
+        book_service.remove_book("Other Book")
+        employee_service.remove_employee("Bob")
+        employee_service.add_employee("Bob", "Manager", "777-777", "bob@example.com")
+        self.assertIsNone(book_service.find_book("Other Book"))
+        self.assertEqual(len(sale_service.get_sales_by_employee("Bob")), 2)
+        self.assertEqual(sale_service.get_sales_by_date("2024-08-30")[0].book.title, "Other Book")
+
+    def test_period_query_uses_index(self):
+        employee_service, book_service, sale_service = self.open_sqlite()
+        where, params = sale_service.period_filter("2024-08-30", "2024-08-31")
+        plan = sale_service.storage.connection.execute(
+            f"EXPLAIN QUERY PLAN SELECT id FROM sales s {where}", params).fetchall()
+        self.assertIn("sales_ordinal", str(plan))
+
+    def test_data_manager_round_trip(self):
+        memory_services = self.open_memory()
+        self.fill(*memory_services)
+        paths = [os.path.join(self.temp_dir.name, name) for name in ("employees.json", "books.json", "sales.json")]
+        DataManager(*memory_services).save_data(*paths)
+        sqlite_services = self.open_sqlite()
+        DataManager(*sqlite_services).load_data(*paths)
+        self.assertEqual(self.reports(sqlite_services), self.reports(memory_services))
+
+    def test_data_manager_skips_rollup_file(self):
+        sqlite_services = self.open_sqlite()
+        self.fill(*sqlite_services)
+        paths = [os.path.join(self.temp_dir.name, name) for name in ("employees.json", "books.json", "sales.json")]
+        rollup_file = os.path.join(self.temp_dir.name, "rollups.json")
+        DataManager(*sqlite_services, rollup_file=rollup_file).save_data(*paths)
+        self.assertFalse(os.path.exists(rollup_file))
+        memory_services = self.open_memory()
+        self.fill(*memory_services)
+        DataManager(*memory_services, rollup_file=rollup_file).save_data(*paths)
+        self.assertTrue(os.path.exists(rollup_file))
+        os.remove(self.db_path)
+        loaded = self.open_sqlite()
+        DataManager(*loaded, rollup_file=rollup_file).load_data(*paths)
+        self.assertEqual(loaded[2].get_rollup('month'), {'2024-08': [2, 21.0, 5.0], '2024-09': [1, 15.0, 5.0]})
+
+
+class TestAsyncBookstore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        employee_service = EmployeeService()
+        book_service = BookService()
+        self.store = AsyncBookstore(employee_service, book_service, SaleService(employee_service, book_service))
+        await self.store.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        await self.store.add_book("Test Book", 2024, "Author", "Genre", 10.0, 15.0)
+
+    async def test_concurrent_writes_and_reads(self):
+        days = [f"2024-08-{day:02d}" for day in range(1, 29)]
+        await asyncio.gather(*(self.store.add_sale("Alice", "Test Book", day, 14.0) for day in days),
+                             self.store.edit_book("Test Book", new_cost=11.0),
+                             *(self.store.generate_top_books_report(1) for _ in range(5)))
+        self.assertEqual(len(await self.store.get_sales_by_period("2024-08-01", "2024-08-31")), 28)
+        self.assertEqual(await self.store.generate_top_books_report(1), "Top 1 selling books:\nTest Book: 28 sales")
+        self.assertEqual((await self.store.find_book("Test Book")).cost, 11.0)
+        with self.assertRaises(ValueError):
+            await self.store.add_sale("Bob", "Test Book", "2024-08-01", 1.0)
+
+    async def test_close_releases_owned_listeners(self):
+        report = self.store.report
+        self.store.close()
+        self.assertNotIn(report.invalidate, self.store.sale_service.listeners)
+        shared = Report(self.store.employee_service, self.store.book_service, self.store.sale_service)
+        store = AsyncBookstore(self.store.employee_service, self.store.book_service, self.store.sale_service,
+                               report=shared)
+        store.close()
+        self.assertIn(shared.invalidate, self.store.sale_service.listeners)
+
+    async def test_load_and_save(self):
+        await self.store.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [os.path.join(temp_dir, name) for name in ("employees.json", "books.json", "sales.json")]
+            await self.store.save_data(*paths)
+            employee_service = EmployeeService()
+            book_service = BookService()
+            store = AsyncBookstore(employee_service, book_service, SaleService(employee_service, book_service))
+            await store.load_data(*paths)
+        self.assertEqual(await store.generate_employee_sales_report("Alice"),
+                         "Sales report for Alice:\n2024-08-30: 'Test Book' sold for 14.0")
+        employees = await store.get_all_employees()
+        self.assertFalse(hasattr(employees, "clear"))
+        await store.remove_employee("Alice")
+        self.assertEqual([employee.name for employee in employees], ["Alice"])
+        self.assertEqual(len(await store.get_all_employees()), 0)
+
+    async def test_read_write_lock(self):
+        lock = AsyncReadWriteLock()
+        events = []
+
+        async def reader(name):
+            async with lock.read():
+                events.append(f"{name} start")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} end")
+
+        async def writer():
+            await asyncio.sleep(0.001)
+            async with lock.write():
+                events.append("writer")
+
+        await asyncio.gather(reader("a"), reader("b"), writer())
+        self.assertEqual(events[:2], ["a start", "b start"])
+        self.assertEqual(events[-1], "writer")
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, metrics, "enabled", metrics.enabled)
+        metrics.enabled = True
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.employee_service = EmployeeService()
+        self.book_service = BookService()
+        self.sale_service = SaleService(self.employee_service, self.book_service)
+
+    def fill(self):
+        self.employee_service.add_employee("Alice", "Manager", "444-444", "alice@example.com")
+        self.book_service.add_books([
+            {"title": "Test Book", "year": 2024, "author": "Author", "genre": "Genre", "cost": 10.0, "sale_price": 15.0}])
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-30", 14.0)
+        self.sale_service.add_sale("Alice", "Test Book", "2024-08-31", 14.0)
+
+    def test_date_queries_are_counted_once(self):
+        self.fill()
+        storage = SQLiteStorage()
+        self.addCleanup(storage.close)
+        employee_service = SQLiteEmployeeService(storage)
+        book_service = SQLiteBookService(storage)
+        sale_service = SQLiteSaleService(storage, employee_service, book_service)
+        for service in (self.sale_service, sale_service):
+            service.get_sales_by_date("2024-08-30")
+            service.get_sales_by_date("2024-08-31")
+        snapshot = metrics.snapshot()
+        for operation in ("SaleService", "SQLiteSaleService"):
+            self.assertEqual(snapshot[f"{operation}.get_sales_by_date"]["calls"], 2)
+            self.assertNotIn(f"{operation}.get_sales_by_period", snapshot)
+
+    def test_snapshot(self):
+        self.fill()
+        with self.assertRaises(ValueError):
+            self.sale_service.add_sale("Bob", "Test Book", "2024-08-31", 14.0)
+        paths = [os.path.join(self.temp_dir.name, name) for name in ("employees.json", "books.json", "sales.json")]
+        DataManager(self.employee_service, self.book_service, self.sale_service).save_data(*paths)
+        employee_service = EmployeeService()
+        book_service = BookService()
+        DataManager(employee_service, book_service, SaleService(employee_service, book_service)).load_data(*paths)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["SaleService.add_sale"]["calls"], 3)
+        self.assertEqual(snapshot["SaleService.add_sale"]["histogram"][float("inf")], 3)
+        self.assertEqual(snapshot["BookService.add_books"]["records"], 2)
+        self.assertEqual(snapshot["DataManager.load_data"]["records"], 4)
+        written = sum(os.path.getsize(path) for path in paths)
+        self.assertEqual(snapshot["DataManager.save_data"]["bytes_written"], written)
+        self.assertEqual(snapshot["DataManager.load_data"]["bytes_read"], written)
+
+    def test_prometheus_dump(self):
+        self.fill()
+        path = os.path.join(self.temp_dir.name, "metrics.prom")
+        metrics.dump_prometheus(path)
+        with open(path) as f:
+            text = f.read()
+        self.assertIn('bookstore_operation_calls_total{operation="SaleService.add_sale"} 2', text)
+        self.assertIn('bookstore_operation_seconds_bucket{operation="SaleService.add_sale",le="+Inf"} 2', text)
+        self.assertIn('bookstore_operation_seconds_count{operation="EmployeeService.add_employee"} 1', text)
+        self.assertIn('bookstore_records_total{operation="BookService.add_books"} 1', text)
+
+    def test_disabled(self):
+        metrics.enabled = False
+        self.fill()
+        self.assertEqual(metrics.snapshot(), {})
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_data_is_reproducible(self):
+        employees, books, sales = generate_data(5, 20, 200, seed=3)
+        self.assertEqual(len(list(sales())), 200)
+        self.assertEqual(list(sales()), list(generate_data(5, 20, 200, seed=3)[2]()))
+        titles = {book["title"] for book in books}
+        self.assertTrue(all(sale["book_title"] in titles for sale in sales()))
+
+    def test_run_and_compare(self):
+        results = run_benchmarks(3, 10, 100, queries=5)
+        self.assertIn("add_sale", results)
+        self.assertIn("generate_top_books_report", results)
+        self.assertIn("load_data_jsonl", results)
+        self.assertIn("load_binary", results)
+        for name in ("search_books", "generate_rollup_report", "generate_sales_report_page", "write_sales_report"):
+            self.assertIn(name, results)
+        slow = {"add_sale": {"seconds": 1.0}}
+        self.assertEqual(compare_results(slow, {"add_sale": {"seconds": 0.5}})[0]["benchmark"], "add_sale")
+        self.assertEqual(compare_results(slow, {"add_sale": {"seconds": 0.9}}), [])
+        self.assertEqual(compare_results({"add_sale": {"seconds": 0.04}}, {"add_sale": {"seconds": 0.01}}), [])
+        self.assertEqual(best_results([slow, {"add_sale": {"seconds": 0.5}}]), {"add_sale": {"seconds": 0.5}})
+
+
 if __name__ == "__main__":
     unittest.main()